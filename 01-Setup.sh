@@ -155,7 +155,7 @@ if [ $? -ne 0 ]; then
 fi
 
 source venv/bin/activate
-pip install lz4 natsort
+pip install lz4 natsort pillow
 if [ $? -ne 0 ]; then
     echo
     echo "Error: Failed to install Python dependencies."
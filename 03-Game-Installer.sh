@@ -20,6 +20,8 @@ ASSETS_DIR="${TOOLKIT_PATH}/assets"
 POPSTARTER="${ASSETS_DIR}/POPStarter/POPSTARTER.ELF"
 NEUTRINO_DIR="${ASSETS_DIR}/neutrino"
 LOG_FILE="${TOOLKIT_PATH}/game-installer.log"
+# Helpers write their PSBBN_PROFILE reports next to the log
+export LOG_FILE
 MISSING_ART=${TOOLKIT_PATH}/missing-art.log
 MISSING_APP_ART=${TOOLKIT_PATH}/missing-app-art.log
 MISSING_ICON=${TOOLKIT_PATH}/missing-icon.log
@@ -115,7 +117,7 @@ clean_up() {
     done
 
     # Remove listed files
-    sudo rm -f "${PS1_LIST}" "${PS2_LIST}" "${ALL_GAMES}" "${ARTWORK_DIR}/tmp"/* "${ICONS_DIR}/ico/tmp"/* "${TOOLKIT_PATH}/ps1.list.tmp" 2>>"$LOG_FILE" \
+    sudo rm -f "${PS1_LIST}" "${PS2_LIST}" "${ALL_GAMES}" "${ARTWORK_DIR}/tmp"/* "${ICONS_DIR}/ico/tmp"/* "${TOOLKIT_PATH}/ps1.list.tmp" "${TOOLKIT_PATH}/sync-plan.json" "${TOOLKIT_PATH}/partitions.list" "${TOOLKIT_PATH}/channel.list" "${TOOLKIT_PATH}/capacity.json" 2>>"$LOG_FILE" \
         || { echo "Error: Cleanup failed. See ${LOG_FILE} for details."; exit 1; }
 }
 
@@ -179,6 +181,14 @@ HDL_TOC() {
     fi
 }
 
+# List the root of a PFS partition, read directly from the drive when possible
+PFS_LS() {
+    local partition="$1" long="$2"
+    if ! sudo python3 "${HELPER_DIR}/apa_reader.py" $long --ls "$partition" "$DEVICE" 2>>"${LOG_FILE}"; then
+        echo -e "device ${DEVICE}\nmount ${partition}\nls ${long}\numount\nexit" | sudo "${HELPER_DIR}/PFS Shell.elf" 2>/dev/null
+    fi
+}
+
 PFS_COMMANDS() {
 PFS_COMMANDS=$(echo -e "$COMMANDS" | sudo "${HELPER_DIR}/PFS Shell.elf" >> "${LOG_FILE}" 2>&1)
 if echo "$PFS_COMMANDS" | grep -q "Exit code is"; then
@@ -216,12 +226,7 @@ POPS_SIZE_CKECK() {
     done <<< "$files_only_in_local"
 
     # Get total size of VCD files on PS2 drive
-    COMMANDS="device ${DEVICE}\n"
-    COMMANDS+="mount __.POPS\n"
-    COMMANDS+="ls -l\n"
-    COMMANDS+="umount\n"
-    COMMANDS+="exit"
-    ps1_size=$(echo -e "$COMMANDS" | sudo "${HELPER_DIR}/PFS Shell.elf" 2>/dev/null)
+    ps1_size=$(PFS_LS __.POPS -l)
     if echo "$ps1_size" | grep -q "Exit code is"; then
         echo "$ps1_size" >> "${LOG_FILE}"
         error_msg "Error" "PFS Shell returned an error. See ${LOG_FILE}"
@@ -267,15 +272,8 @@ POPS_SYNC() {
         error_msg "Error" "Failed to create list of local .VCD files. See ${LOG_FILE}"
     fi
 
-    # Build the commands for PFS Shell
-    COMMANDS="device ${DEVICE}\n"
-    COMMANDS+="mount __.POPS\n"
-    COMMANDS+="ls\n"
-    COMMANDS+="umount\n"
-    COMMANDS+="exit"
-
-    # Get the PS1 file list directly from PFS Shell output, filtered and sorted
-    ps1_files=$(echo -e "$COMMANDS" | sudo "${HELPER_DIR}/PFS Shell.elf" 2>/dev/null)
+    # Get the PS1 file list from the drive, filtered and sorted
+    ps1_files=$(PFS_LS __.POPS)
     if echo "$ps1_files" | grep -q "Exit code is"; then
         echo "$ps1_files" >> "${LOG_FILE}"
         error_msg "Error" "PFS Shell returned an error. See ${LOG_FILE}"
@@ -288,6 +286,10 @@ POPS_SYNC() {
 
         # Create an array of POPS files for easy comparison
         mapfile -t pops_array < <(echo "$ps1_files")
+        declare -A on_drive=()
+        for pops_file in "${pops_array[@]}"; do
+            [[ -n "$pops_file" ]] && on_drive["$pops_file"]=1
+        done
 
         # Initialize a temporary file
         temp_list="${TOOLKIT_PATH}/ps1.list.tmp"
@@ -296,15 +298,17 @@ POPS_SYNC() {
         missing_from_list=false
 
         while IFS= read -r line; do
-            vcd_file=$(echo "$line" | awk -F '|' '{print $5}')
-            if printf '%s\n' "${pops_array[@]}" | grep -Fxq "$vcd_file"; then
+            IFS='|' read -r _ _ _ _ vcd_file <<< "$line"
+            if [[ -n "$vcd_file" && -n "${on_drive[$vcd_file]}" ]]; then
                 echo "$line" >> "$temp_list"
             fi
         done < "${OPL}/ps1.list"
 
         # Check if any file in __.POPS is missing from ps1.list
         for pops_file in "${pops_array[@]}"; do
-            if ! grep -Fq "|$pops_file" "${OPL}/ps1.list"; then
+            [[ -n "$pops_file" ]] || continue
+            METADATA_QUERY file "${OPL}/ps1.list" "$pops_file"
+            if [[ -z "$metadata" ]]; then
                 missing_from_list=true
                 break
             fi
@@ -391,17 +395,25 @@ POPS_SYNC() {
 
 OPL_SIZE_CKECK() {
 
+    # Walk the CD and DVD folders once, the plan is used for the size check and then for the copy
+    sync_plan="${TOOLKIT_PATH}/sync-plan.json"
+    if [ "$INSTALL_TYPE" = "sync" ]; then
+        delete_option="-d"
+    else
+        delete_option=""
+    fi
+    plan_totals=$(python3 "${HELPER_DIR}/sync-planner.py" $delete_option -o "$sync_plan" "${GAMES_PATH}" "${OPL}" CD DVD 2>>"${LOG_FILE}") || error_msg "Error" "Failed to plan the PS2 game $INSTALL_TYPE. See ${LOG_FILE} for details."
+    eval "$plan_totals"
+
     if [ "$INSTALL_TYPE" = "sync" ]; then
         opl_size=$(df -m --output=size "${OPL}" | tail -n 1 | awk '{$1=$1};1')
         available_mb=$((opl_size - 128))
-        needed_mb=$(ls -l "${GAMES_PATH}/CD" "${GAMES_PATH}/DVD" | awk '{s+=$5} END {print int((s + 1048575) / 1048576)}')
+        needed_mb=$source_mb
 
     elif [ "$INSTALL_TYPE" = "copy" ]; then
         opl_freespace=$(df -m "${OPL}/" | awk 'NR==2 {print $4}')
         available_mb=$((opl_freespace - 128))
-        cd_size=$(rsync -rL --ignore-existing --exclude=".*" --dry-run --out-format="%l" "${GAMES_PATH}/CD/" "${OPL}/CD/" | awk '{s+=$1} END {printf "%.0f\n", s / (1024*1024)}')
-        dvd_size=$(rsync -rL --ignore-existing --exclude=".*" --dry-run --out-format="%l" "${GAMES_PATH}/DVD/" "${OPL}/DVD/" | awk '{s+=$1} END {printf "%.0f\n", s / (1024*1024)}')
-        needed_mb=$((cd_size + dvd_size))
+        needed_mb=$copy_mb
     fi 
 
     if (( available_mb < needed_mb )); then
@@ -411,10 +423,13 @@ OPL_SIZE_CKECK() {
 
 # Function to find available space
 APA_SIZE_CHECK() {
-    HDL_TOC
+    # Read the used space straight from the APA partition table, fall back to HDL Dump
+    if ! used=$(sudo python3 "${HELPER_DIR}/apa_reader.py" --used "$DEVICE" 2>>"${LOG_FILE}"); then
+        HDL_TOC
 
-    # Extract the "used" value, remove "MB" and any commas
-    used=$(cat "$hdl_output" | awk '/used:/ {print $6}' | sed 's/,//; s/MB//')
+        # Extract the "used" value, remove "MB" and any commas
+        used=$(cat "$hdl_output" | awk '/used:/ {print $6}' | sed 's/,//; s/MB//')
+    fi
     capacity=129960
 
     # Calculate available space (capacity - used)
@@ -422,6 +437,18 @@ APA_SIZE_CHECK() {
     pp_max=$(((available / 8) - 1))
 }
 
+# Look up TitlesDB, ArtDB, AppDB or a games list, the answer is left in $metadata
+METADATA_QUERY() {
+    # One helper process answers every query of the install, it is started on the first one
+    if [[ -z "${METADATA[1]}" ]]; then
+        coproc METADATA { python3 "${HELPER_DIR}/metadata_lookup.py" 2>>"${LOG_FILE}"; }
+    fi
+    local IFS=$'\t'
+    metadata=""
+    printf '%s\n' "$*" >&"${METADATA[1]}"
+    IFS= read -r metadata <&"${METADATA[0]}"
+}
+
 app_success_check() {
     local name="$1"
     if [ $exit_code -ne 0 ]; then
@@ -609,7 +636,8 @@ install_elf() {
             AppDB_check=$(echo "$app_name" | sed 's/[ _-]//g' | tr 'a-z' 'A-Z')
 
             # Check $HELPER_DIR/AppDB.csv for match in first column to $AppDB_check, set $title based on second column from file if found. If no match found, set $title with the remaining code
-            match=$(awk -F'|' -v key="$AppDB_check" '$1 && index(key, $1) == 1 {print $2; exit}' "$HELPER_DIR/AppDB.csv")
+            METADATA_QUERY app "$AppDB_check"
+            match="$metadata"
 
             if [[ -n "$match" ]]; then
                 title="$match"
@@ -752,7 +780,14 @@ convert_zso() {
             iso_file="${zso_file%.*}.iso"
             echo "Converting: $zso_file -> $iso_file" | tee -a "${LOG_FILE}"
 
-            python3 -u "${HELPER_DIR}/ziso.py" -c 0 "$zso_file" "$iso_file" | tee -a "${LOG_FILE}"
+            # exFAT has no sparse files, write the zero blocks out on the OPL partition
+            if [[ "$zso_file" == "${OPL}/"* ]]; then
+                dense_option="-d"
+            else
+                dense_option=""
+            fi
+
+            python3 -u "${HELPER_DIR}/ziso.py" $dense_option -c 0 "$zso_file" "$iso_file" | tee -a "${LOG_FILE}"
             if [ "${PIPESTATUS[0]}" -ne 0 ]; then
                 rm -f "$iso_file"
                 error_msg "Error" "Failed to uncompress $zso_file"
@@ -763,15 +798,6 @@ convert_zso() {
     fi
 }
 
-PP_NAME() {
-# Format game id correctly for partition
-    title_id=$(echo "$game_id" | sed -E 's/_(...)\./-\1/;s/\.//')
-
-    # Sanitize title by keeping only uppercase A-Z, 0-9, and underscores, and removing any trailing underscores
-    sanitized_title=$(echo "$title" | sed 's/²/2/g; s/³/3/g' | iconv -f UTF-8 -t ASCII//TRANSLIT | tr 'a-z' 'A-Z' | sed 's/[^A-Z0-9]/_/g' | sed 's/^_//; s/_$//; s/__*/_/g')
-    PARTITION_LABEL=$(printf "PP.%s.%s" "$title_id" "$sanitized_title" | cut -c 1-32 | sed 's/_$//')
-}
-
 create_info_sys() {
     local title="$1"
     local title_id="$2"
@@ -1227,11 +1253,8 @@ if [ "$INSTALL_TYPE" = "sync" ]; then
     convert_zso
     OPL_SIZE_CKECK
 
-    cd=$(rsync -rL --progress --ignore-existing --delete --exclude='.*' --dry-run "${GAMES_PATH}/CD/" "${OPL}/CD/")
-    dvd=$(rsync -rL --progress --ignore-existing --delete --exclude='.*' --dry-run "${GAMES_PATH}/DVD/" "${OPL}/DVD/")
-
-    # Check if either output contains more than one line
-    if [ $(echo "$cd" | wc -l) -ne 1 ] || [ $(echo "$dvd" | wc -l) -ne 1 ]; then
+    # Check if the plan copies or deletes anything
+    if (( copy_files > 0 || delete_files > 0 )); then
         needs_update=true
     fi
 
@@ -1240,10 +1263,9 @@ if [ "$INSTALL_TYPE" = "sync" ]; then
         echo "Available space: $available_mb MB" | tee -a "${LOG_FILE}"
         echo | tee -a "${LOG_FILE}"
         echo "Syncing PS2 games..." | tee -a "${LOG_FILE}"
-        rsync -rL --progress --ignore-existing --delete --exclude='.*' "${GAMES_PATH}/CD/" "${OPL}/CD/" 2>>"${LOG_FILE}" | tee -a "${LOG_FILE}"
+        python3 -u "${HELPER_DIR}/sync-planner.py" -r "$sync_plan" 2>>"${LOG_FILE}" | tee -a "${LOG_FILE}"
         cd_status=${PIPESTATUS[0]}
-        rsync -rL --progress --ignore-existing --delete --exclude='.*' "${GAMES_PATH}/DVD/" "${OPL}/DVD/" 2>>"${LOG_FILE}" | tee -a "${LOG_FILE}"
-        dvd_status=${PIPESTATUS[0]}
+        dvd_status=$cd_status
         ps2_rsync_check Synced
     else
         echo "PS2 games are already up-to-date." | tee -a "${LOG_FILE}"
@@ -1269,17 +1291,15 @@ elif [ "$INSTALL_TYPE" = "copy" ]; then
     convert_zso
     OPL_SIZE_CKECK
 
-    if (( needed_mb > 0 )); then
+    if (( copy_files > 0 )); then
         echo "Total size of PS2 games to be copied: $needed_mb MB" | tee -a "${LOG_FILE}"
         echo "Available space: $available_mb MB" | tee -a "${LOG_FILE}"
         echo | tee -a "${LOG_FILE}"
         echo "Copying PS2 games..."
-        # Update PS2 CD games
-        rsync -rL --progress --ignore-existing --exclude=".*" "${GAMES_PATH}/CD/" "${OPL}/CD/" 2>>"${LOG_FILE}" | tee -a "${LOG_FILE}"
+        # Copy new PS2 CD and DVD games
+        python3 -u "${HELPER_DIR}/sync-planner.py" -r "$sync_plan" 2>>"${LOG_FILE}" | tee -a "${LOG_FILE}"
         cd_status=${PIPESTATUS[0]}
-        # Update PS2 DVD games
-        rsync -rL --progress --ignore-existing --exclude=".*" "${GAMES_PATH}/DVD/" "${OPL}/DVD/" 2>>"${LOG_FILE}" | tee -a "${LOG_FILE}"
-        dvd_status=${PIPESTATUS[0]}
+        dvd_status=$cd_status
         ps2_rsync_check copied
     else
         echo "No PS2 games to copy." | tee -a "${LOG_FILE}"
@@ -1292,12 +1312,7 @@ echo "APPS on PS2 drive:" >> "${LOG_FILE}"
 ls -1 "${OPL}/APPS/" >> "${LOG_FILE}" 2>&1
 echo >> "${LOG_FILE}"
 echo "PS1 games on PS2 drive:" >> "${LOG_FILE}"
-COMMANDS="device ${DEVICE}\n"
-COMMANDS+="mount __.POPS\n"
-COMMANDS+="ls\n"
-COMMANDS+="umount\n"
-COMMANDS+="exit"
-echo -e "$COMMANDS" | sudo "${HELPER_DIR}/PFS Shell.elf" 2>&1 | grep -i '\.vcd$' >> "${LOG_FILE}"
+PFS_LS __.POPS | grep -i '\.vcd$' >> "${LOG_FILE}"
 echo >> "${LOG_FILE}"
 echo "PS2 games on PS2 drive:" >> "${LOG_FILE}"
 ls -1 "${OPL}/CD/" >> "${LOG_FILE}" 2>&1
@@ -1336,9 +1351,6 @@ if [ -f "${PS2_LIST}" ]; then
     python3 "${HELPER_DIR}/list-sorter.py" "${PS2_LIST}" || error_msg "Error" "Failed to sort PS2 games list."
 fi
 
-# Deactivate the virtual environment
-deactivate
-
 # Create master list combining PS1 and PS2 games to a single list
 if [[ ! -f "${PS1_LIST}" && ! -f "${PS2_LIST}" ]] && find "${GAMES_PATH}/CD" "${GAMES_PATH}/DVD" -maxdepth 1 -type f \( -iname "*.iso" -o -iname "*.zso" \) | grep -q .; then
     error_msg "Error" "Failed to create games list."
@@ -1390,29 +1402,32 @@ SOURCE_DIR="${OPL}/APPS"
 
 APA_SIZE_CHECK
 
-if [ "$pp_max" -gt "$pp_cap" ]; then
-  pp_max="$pp_cap"
+# Work out which apps and games get a partition before any assets are created
+if ! plan_vars=$(python3 "${HELPER_DIR}/capacity_planner.py" -a "$available" -c "$pp_cap" -g "${GAMES_PATH}" -g "${OPL}" \
+    -o "${TOOLKIT_PATH}/channel.list" -r "${TOOLKIT_PATH}/capacity.json" "${SOURCE_DIR}" "${ALL_GAMES}" 2>>"${LOG_FILE}"); then
+    error_msg "Error" "Failed to plan the Game Channel partitions. See ${LOG_FILE} for details."
 fi
+eval "$plan_vars"
 
 echo "Max Partitions: $pp_max" >> "${LOG_FILE}"
+echo "Capacity plan:" >> "${LOG_FILE}"
+cat "${TOOLKIT_PATH}/capacity.json" >> "${LOG_FILE}"
+echo >> "${LOG_FILE}"
 
-SAS_COUNT="0"
+if [ "${#SAS_APPS[@]}" -lt "$sas_total" ]; then
+    error_msg "Warning" "Insufficient space to create BBL partitions for remaining SAS apps." " " "The first ${#SAS_APPS[@]} apps will appear in the PSBBN Game Channel." "All apps will appear in OPL."
+fi
 
-for dir in "${SOURCE_DIR}"/*/; do
-    [[ -d "$dir" ]] || continue
+if [ "${#ELF_APPS[@]}" -lt "$elf_total" ]; then
+    error_msg "Warning" "Insufficient space to create BBL partitions for remaining ELF files." " " "The first ${#ELF_APPS[@]} apps will appear in the PSBBN Game Channel." "All apps will appear in OPL."
+fi
 
-    # Stop if we've reached the limit
-    if [ "$SAS_COUNT" -ge "$pp_max" ]; then
-        error_msg "Warning" "Insufficient space to create BBL partitions for remaining SAS apps." " " "The first $pp_max apps will appear in the PSBBN Game Channel." "All apps will appear in OPL."
-        break
-    fi
+if [ "$game_fit" -lt "$game_total" ]; then
+    error_msg "Warning" "Insufficient space to create BBL partitions for remaining games." " " "The first $game_fit games will appear in the PSBBN Game Channel." "All PS2 games will appear in OPL/NHDDL."
+fi
 
-    # Check for .elf/.ELF file
-    if find "$dir" -maxdepth 1 -type f -iname "*.elf" | grep -q . && \
-       [[ -f "$dir/icon.sys" && -f "$dir/title.cfg" ]]; then
-        cp -r "$dir" "${ICONS_DIR}/SAS" 2>>"${LOG_FILE}" || error_msg "Error" "Failed to copy $dir. See ${LOG_FILE} for details."
-        SAS_COUNT=$((SAS_COUNT + 1))
-    fi
+for folder in "${SAS_APPS[@]}"; do
+    cp -r "${SOURCE_DIR}/$folder" "${ICONS_DIR}/SAS" 2>>"${LOG_FILE}" || error_msg "Error" "Failed to copy ${SOURCE_DIR}/$folder. See ${LOG_FILE} for details."
 done
 
 if ! find "${ICONS_DIR}/SAS" -mindepth 1 -maxdepth 1 -type d ! -name '.*' | grep -q .; then
@@ -1481,27 +1496,8 @@ fi
 
 ################################### Assets for ELF Files ###################################
 
-pp_max=$(( pp_max - SAS_COUNT ))
-
-echo "PP Max after SAS: $pp_max"
-
-APP_COUNT=0
-
-for dir in "${SOURCE_DIR}"/*/; do
-    [[ -d "$dir" ]] || continue
-
-    # Stop if we've reached the max
-    if [ "$APP_COUNT" -ge "$pp_max" ]; then
-        error_msg "Warning" "Insufficient space to create BBL partitions for remaining ELF files." " " "The first $pp_max apps will appear in the PSBBN Game Channel." "All apps will appear in OPL."
-        break
-    fi
-
-    # Check for .elf/.ELF file
-    if find "$dir" -maxdepth 1 -type f -iname "*.elf" | grep -q . && \
-       [[ ! -f "$dir/icon.sys" && -f "$dir/title.cfg" ]]; then
-        cp -r "$dir" "${ICONS_DIR}/APPS" 2>>"${LOG_FILE}" || error_msg "Error" "Failed to copy $dir. See ${LOG_FILE} for details."
-        APP_COUNT=$((APP_COUNT + 1))
-    fi
+for folder in "${ELF_APPS[@]}"; do
+    cp -r "${SOURCE_DIR}/$folder" "${ICONS_DIR}/APPS" 2>>"${LOG_FILE}" || error_msg "Error" "Failed to copy ${SOURCE_DIR}/$folder. See ${LOG_FILE} for details."
 done
 
 if ! find "${ICONS_DIR}/APPS" -mindepth 1 -maxdepth 1 -type d ! -name '.*' | grep -q .; then
@@ -1574,65 +1570,16 @@ if [ -f "$ALL_GAMES" ]; then
     echo | tee -a "${LOG_FILE}"
     echo "Downloading OPL artwork for games..."  | tee -a "${LOG_FILE}"
 
-    # First loop: Run the art downloader script for each game_id if artwork doesn't already exist
-    exec 3< "$ALL_GAMES"
-    while IFS='|' read -r title game_id publisher disc_type file_name <&3; do
-        # Skip downloading if disc_type is "POPS"
-        if [[ "$disc_type" == "POPS" ]]; then
-            continue
-        fi
-
-        png_file_cover="${GAMES_PATH}/ART/${game_id}_COV.png"
-        png_file_disc="${GAMES_PATH}/ART/${game_id}_ICO.png"
-        if [[ -f "$png_file_cover" ]]; then
-            echo "OPL Artwork for $game_id already exists. Skipping download." | tee -a "${LOG_FILE}"
-        else
-            # Attempt to download artwork using wget
-            echo -n "OPL Artwork not found locally. Attempting to download from archive.org..." | tee -a "${LOG_FILE}"
-            echo | tee -a "${LOG_FILE}"
-            wget --quiet --timeout=10 --tries=3 --output-document="$png_file_cover" \
-            "https://archive.org/download/OPLM_ART_2024_09/OPLM_ART_2024_09.zip/PS2/${game_id}/${game_id}_COV.png"
-            #wget --quiet --timeout=10 --tries=3 --output-document="$png_file_disc" \
-            #"https://archive.org/download/OPLM_ART_2024_09/OPLM_ART_2024_09.zip/PS2/${game_id}/${game_id}_ICO.png"
-
-            missing_files=()
-
-            if [[ ! -s "$png_file_cover" ]]; then
-                [[ -f "$png_file_cover" ]] && rm -f "$png_file_cover"
-                missing_files+=("cover")
-            fi
-
-            if [[ ! -s "$png_file_disc" ]]; then
-                [[ -f "$png_file_disc" ]] && rm -f "$png_file_disc"
-                missing_files+=("disc")
-            fi
-
-            if [[ -f "$png_file_cover" || -f "$png_file_disc" ]]; then
-                if [[ ${#missing_files[@]} -eq 0 ]]; then
-                    echo "Successfully downloaded OPL artwork for $game_id" | tee -a "${LOG_FILE}"
-                else
-                    echo "Successfully downloaded some OPL artwork for $game_id, but missing: ${missing_files[*]}" | tee -a "${LOG_FILE}"
-                fi
-            else
-                echo "Failed to download OPL artwork for $game_id" | tee -a "${LOG_FILE}"
-            fi
-        fi
-    done
-    exec 3<&-
+    # Download missing covers in parallel, skipping games known to have no artwork on archive.org
+    python3 -u "${HELPER_DIR}/art-fetcher.py" -c "${ARTWORK_DIR}/cache/misses.json" opl "${ALL_GAMES}" "${GAMES_PATH}/ART" 2>&1 | tee -a "${LOG_FILE}"
 else
     echo | tee -a "${LOG_FILE}"
     echo "No OPL artwork to download." | tee -a "${LOG_FILE}"
 fi
 
-GAME_COUNT=$(grep -c '^[^[:space:]]' "${ALL_GAMES}")
-
-pp_max=$(( pp_max - APP_COUNT ))
-
-if [ "$GAME_COUNT" -gt "$pp_max" ]; then
-    error_msg "Warning" "Insufficient space to create BBL partitions for remaining games." " " "The first $pp_max games will appear in the PSBBN Game Channel." "All PS2 games will appear in OPL/NHDDL."
-    # Overwrite master.list with the first $pp_max lines
-    head -n "$pp_max" "$ALL_GAMES" > "${ALL_GAMES}.tmp"
-    mv "${ALL_GAMES}.tmp" "$ALL_GAMES" 2>>"${LOG_FILE}" || error_msg "Error" "Failed to updated master.list."
+if [ -f "$ALL_GAMES" ] && [ "$game_fit" -lt "$game_total" ]; then
+    # Every game got OPL artwork, from here on master.list only has the games planned for the Game Channel
+    mv "${TOOLKIT_PATH}/channel.list" "$ALL_GAMES" 2>>"${LOG_FILE}" || error_msg "Error" "Failed to updated master.list."
     echo "Updated master.list:" >> "${LOG_FILE}"
     cat "$ALL_GAMES" >> "${LOG_FILE}"
     echo >> "${LOG_FILE}"
@@ -1644,30 +1591,16 @@ if [ -f "$ALL_GAMES" ]; then
     echo | tee -a "${LOG_FILE}"
     echo "Downloading PSBBN artwork for games..."  | tee -a "${LOG_FILE}"
 
-    # First loop: Run the art downloader script for each game_id if artwork doesn't already exist
-    exec 3< "$ALL_GAMES"
-    while IFS='|' read -r title game_id publisher disc_type file_name <&3; do
-        # Check if the artwork file already exists
-        png_file="${ARTWORK_DIR}/${game_id}.png"
-        if [[ -f "$png_file" ]]; then
-            echo "Artwork for $game_id already exists. Skipping download." | tee -a "${LOG_FILE}"
-        else
-            # Attempt to download artwork using wget
-            echo -n "Artwork not found locally. Attempting to download from the PSBBN art database..." | tee -a "${LOG_FILE}"
-            echo | tee -a "${LOG_FILE}"
-            wget --quiet --timeout=10 --tries=3 --output-document="$png_file" \
-            "https://raw.githubusercontent.com/CosmicScale/psbbn-art-database/main/art/${game_id}.png"
-            if [[ -s "$png_file" ]]; then
-                echo "Successfully downloaded artwork for $game_id" | tee -a "${LOG_FILE}"
-            else
-                # If wget fails, run the art downloader
-                [[ -f "$png_file" ]] && rm -f "$png_file"
-                echo "Trying IGN for $game_id" | tee -a "${LOG_FILE}"
-                node "${HELPER_DIR}/art_downloader.js" "$game_id" 2>&1 | tee -a "${LOG_FILE}"
-            fi
-        fi
-    done
-    exec 3<&-
+    # Download missing artwork in parallel, then try IGN for games listed in ArtDB.csv that are still missing
+    art_misses=$(mktemp)
+    python3 -u "${HELPER_DIR}/art-fetcher.py" -c "${ARTWORK_DIR}/cache/misses.json" -m "$art_misses" -a "${HELPER_DIR}/ArtDB.csv" \
+        psbbn "${ALL_GAMES}" "${ARTWORK_DIR}" 2>&1 | tee -a "${LOG_FILE}"
+
+    while IFS= read -r game_id; do
+        echo "Trying IGN for $game_id" | tee -a "${LOG_FILE}"
+        node "${HELPER_DIR}/art_downloader.js" "$game_id" 2>&1 | tee -a "${LOG_FILE}"
+    done < "$art_misses"
+    rm -f "$art_misses"
 
     # Define input directory
     input_dir="${ARTWORK_DIR}/tmp"
@@ -1676,36 +1609,11 @@ if [ -f "$ALL_GAMES" ]; then
     if compgen -G "${input_dir}/*" > /dev/null; then
         echo | tee -a "${LOG_FILE}"
         echo "Converting artwork..." | tee -a "${LOG_FILE}"
-        for file in "${input_dir}"/*; do
-            # Extract the base filename without the path or extension
-            base_name=$(basename "${file%.*}")
-
-            # Define output filename with .png extension
-            output="${ARTWORK_DIR}/tmp/${base_name}.png"
-
-            # Get image dimensions using identify
-            dimensions=$(identify -format "%w %h" "$file")
-            width=$(echo "$dimensions" | cut -d' ' -f1)
-            height=$(echo "$dimensions" | cut -d' ' -f2)
-
-            # Check if width >= 256 and height >= width
-            if [[ $width -ge 256 && $height -ge $width ]]; then
-                # Determine whether the image is square
-                if [[ $width -eq $height ]]; then
-                    # Square: Resize without cropping
-                    echo "Resizing square image $file"
-                    convert "$file" -resize 256x256! -depth 8 -alpha off "$output"
-                else
-                    # Not square: Resize and crop
-                    echo "Resizing and cropping $file"
-                    convert "$file" -resize 256x256^ -crop 256x256+0+44 -depth 8 -alpha off "$output"
-                fi
-                rm -f "$file"
-            else
-                echo "Skipping $file: does not meet size requirements" | tee -a "${LOG_FILE}"
-                rm -f "$file"
-            fi
-        done
+        # Decode, resize and crop each image once, in parallel, reusing conversions cached in ${ARTWORK_DIR}/cache
+        python3 -u "${HELPER_DIR}/art-converter.py" "${input_dir}" "${ARTWORK_DIR}/cache" 2>&1 | tee -a "${LOG_FILE}"
+        if [ "${PIPESTATUS[0]}" -ne 0 ]; then
+            error_msg "Error" "Failed to convert artwork. See ${LOG_FILE} for details."
+        fi
     else
         echo | tee -a "${LOG_FILE}"
         echo "No artwork to convert in ${input_dir}" | tee -a "${LOG_FILE}"
@@ -1716,194 +1624,83 @@ if [ -f "$ALL_GAMES" ]; then
     echo | tee -a "${LOG_FILE}"
     echo "Dowbloading HDD-OSD icons for games:"  | tee -a "${LOG_FILE}"
 
+    python3 -u "${HELPER_DIR}/art-fetcher.py" -c "${ARTWORK_DIR}/cache/misses.json" ico "${ALL_GAMES}" "${ICONS_DIR}/ico" 2>&1 | tee -a "${LOG_FILE}"
+
+    # Icons not in the HDD-OSD icon database are built from the cover art, start from the OPL covers already downloaded
     exec 3< "$ALL_GAMES"
     while IFS='|' read -r title game_id publisher disc_type file_name <&3; do
+        if [[ ! -s "${ICONS_DIR}/ico/$game_id.ico" && -s "${GAMES_PATH}/ART/${game_id}_COV.png" ]]; then
+            cp "${GAMES_PATH}/ART/${game_id}_COV.png" "${TOOLKIT_PATH}/icons/ico/tmp/${game_id}_COV.png"
+        fi
+    done
+    exec 3<&-
 
-        ico_file="${ICONS_DIR}/ico/$game_id.ico"
-        
-        if [[ ! -s "$ico_file" ]]; then
-            # Attempt to download icon using wget
-            echo -n "Icon not found locally for $game_id. Attempting to download from the HDD-OSD icon database..." | tee -a "${LOG_FILE}"
-            echo | tee -a "${LOG_FILE}"
-            wget --quiet --timeout=10 --tries=3 --output-document="$ico_file" \
-            "https://raw.githubusercontent.com/CosmicScale/HDD-OSD-Icon-Database/main/ico/${game_id}.ico"
-            if [[ -s "$ico_file" ]]; then
-                echo "Successfully downloaded icon for ${game_id}." | tee -a "${LOG_FILE}"
-                echo | tee -a "${LOG_FILE}"
-            else
-                # If wget fails, run the art downloader
-                [[ -f "$ico_file" ]] && rm -f "$ico_file"
-
-                png_file_cov="${TOOLKIT_PATH}/icons/ico/tmp/${game_id}_COV.png"
-                png_file_cov2="${TOOLKIT_PATH}/icons/ico/tmp/${game_id}_COV2.png"
-                png_file_lab="${TOOLKIT_PATH}/icons/ico/tmp/${game_id}_LAB.png"
+    echo | tee -a "${LOG_FILE}"
+    echo "Downloading icon assets for games not on the HDD-OSD icon database:" | tee -a "${LOG_FILE}"
 
-                echo -n "Icon not found on database. Downloading icon assets for $game_id..." | tee -a "${LOG_FILE}"
+    # Covers, back covers and disc labels in parallel, the back cover and label only for games with a cover
+    python3 -u "${HELPER_DIR}/art-fetcher.py" -c "${ARTWORK_DIR}/cache/misses.json" -s "${ICONS_DIR}/ico/{id}.ico" \
+        ps1-cov,ps2-cov,ps1-cov2,ps2-cov2,ps1-lab,ps2-lab "${ALL_GAMES}" "${TOOLKIT_PATH}/icons/ico/tmp" 2>&1 | tee -a "${LOG_FILE}"
 
-                if [[ -s "${GAMES_PATH}/ART/${game_id}_COV.png" ]]; then
-                    cp "${GAMES_PATH}/ART/${game_id}_COV.png" "${png_file_cov}"
-                else
-                    wget --quiet --timeout=10 --tries=3 --output-document="${png_file_cov}" \
-                    "https://archive.org/download/OPLM_ART_2024_09/OPLM_ART_2024_09.zip/PS1/${game_id}/${game_id}_COV.png"
-                fi
+    exec 3< "$ALL_GAMES"
+    while IFS='|' read -r title game_id publisher disc_type file_name <&3; do
 
-                if [[ -s "$png_file_cov" && "$disc_type" != "POPS" ]]; then
-                    wget --quiet --timeout=10 --tries=3 --output-document="$png_file_cov2" \
-                    "https://archive.org/download/OPLM_ART_2024_09/OPLM_ART_2024_09.zip/PS2/${game_id}/${game_id}_COV2.png"
-                    wget --quiet --timeout=10 --tries=3 --output-document="$png_file_lab" \
-                    "https://archive.org/download/OPLM_ART_2024_09/OPLM_ART_2024_09.zip/PS2/${game_id}/${game_id}_LAB.png"
-                elif [[ -s "$png_file_cov" && "$disc_type" == "POPS" ]]; then
-                    wget --quiet --timeout=10 --tries=3 --output-document="$png_file_cov2" \
-                    "https://archive.org/download/OPLM_ART_2024_09/OPLM_ART_2024_09.zip/PS1/${game_id}/${game_id}_COV2.png"
-                    wget --quiet --timeout=10 --tries=3 --output-document="$png_file_lab" \
-                    "https://archive.org/download/OPLM_ART_2024_09/OPLM_ART_2024_09.zip/PS1/${game_id}/${game_id}_LAB.png"
-                fi
+        ico_file="${ICONS_DIR}/ico/$game_id.ico"
+        
+        if [[ ! -s "$ico_file" ]]; then
+            png_file_cov="${TOOLKIT_PATH}/icons/ico/tmp/${game_id}_COV.png"
+            png_file_cov2="${TOOLKIT_PATH}/icons/ico/tmp/${game_id}_COV2.png"
+            png_file_lab="${TOOLKIT_PATH}/icons/ico/tmp/${game_id}_LAB.png"
 
-                echo | tee -a "${LOG_FILE}"
-
-                if [[ ! -s "$png_file_lab" ]]; then
-                    if [[ "${game_id:2:1}" == "E" ]]; then
-                        if [[ "$disc_type" != "POPS" ]]; then
-                            cp "${ASSETS_DIR}/Icon-templates/PS2_LAB_PAL.png" "${png_file_lab}"
-                        else
-                            cp "${ASSETS_DIR}/Icon-templates/PS1_LAB_PAL.png" "${png_file_lab}"
-                        fi
-                    elif [[ "${game_id:2:1}" == "U" || "${game_id:0:1}" == "L" ]]; then
-                        if [[ "$disc_type" != "POPS" ]]; then
-                            cp "${ASSETS_DIR}/Icon-templates/PS2_LAB_USA.png" "${png_file_lab}"
-                    else
-                            cp "${ASSETS_DIR}/Icon-templates/PS1_LAB_USA.png" "${png_file_lab}"
-                        fi
+            if [[ ! -s "$png_file_lab" ]]; then
+                if [[ "${game_id:2:1}" == "E" ]]; then
+                    if [[ "$disc_type" != "POPS" ]]; then
+                        cp "${ASSETS_DIR}/Icon-templates/PS2_LAB_PAL.png" "${png_file_lab}"
                     else
-                        if [[ "$disc_type" != "POPS" ]]; then
-                            cp "${ASSETS_DIR}/Icon-templates/PS2_LAB_JPN.png" "${png_file_lab}"
-                        else
-                            cp "${ASSETS_DIR}/Icon-templates/PS1_LAB_JPN.png" "${png_file_lab}"
-                        fi
+                        cp "${ASSETS_DIR}/Icon-templates/PS1_LAB_PAL.png" "${png_file_lab}"
                     fi
-                fi
-
-                if [[ -s "$png_file_cov" && -s "$png_file_cov2" && -s "$png_file_lab" ]]; then
-                    echo -n "Creating HDD-OSD icon for $game_id..." | tee -a "${LOG_FILE}"
+                elif [[ "${game_id:2:1}" == "U" || "${game_id:0:1}" == "L" ]]; then
                     if [[ "$disc_type" != "POPS" ]]; then
-                        if [[ "${game_id:2:1}" == "E" ]]; then
-                            "${HELPER_DIR}/ps2iconmaker.sh" $game_id -t 2
-                        else
-                            "${HELPER_DIR}/ps2iconmaker.sh" $game_id -t 1
-                        fi
-                    else
-                        if [[ "${game_id:2:1}" == "U" || "${game_id:0:1}" == "L" ]]; then
-                            "${HELPER_DIR}/ps2iconmaker.sh" $game_id -t 3
-                        elif [[ "${game_id:2:1}" == "E" ]]; then
-                            "${HELPER_DIR}/ps2iconmaker.sh" $game_id -t 6
-                        else
-                            "${HELPER_DIR}/ps2iconmaker.sh" $game_id -t 5
-                        fi
+                        cp "${ASSETS_DIR}/Icon-templates/PS2_LAB_USA.png" "${png_file_lab}"
+                else
+                        cp "${ASSETS_DIR}/Icon-templates/PS1_LAB_USA.png" "${png_file_lab}"
                     fi
-                    echo | tee -a "${LOG_FILE}"
                 else
-                    echo "Insufficient assets to create icon for $game_id." | tee -a "${LOG_FILE}"
-                    echo | tee -a "${LOG_FILE}"
+                    if [[ "$disc_type" != "POPS" ]]; then
+                        cp "${ASSETS_DIR}/Icon-templates/PS2_LAB_JPN.png" "${png_file_lab}"
+                    else
+                        cp "${ASSETS_DIR}/Icon-templates/PS1_LAB_JPN.png" "${png_file_lab}"
+                    fi
                 fi
             fi
+
+            if [[ -s "$png_file_cov" && -s "$png_file_cov2" && -s "$png_file_lab" ]]; then
+                # Icons are created for all games in one batch once the downloads are done
+                echo "Queued HDD-OSD icon for $game_id." | tee -a "${LOG_FILE}"
+            else
+                echo "Insufficient assets to create icon for $game_id." | tee -a "${LOG_FILE}"
+            fi
         fi
     done
     exec 3<&-
 
+    python3 -u "${HELPER_DIR}/ps2iconmaker.py" "${ALL_GAMES}" "${ASSETS_DIR}/Icon-templates" "${ICONS_DIR}/ico/tmp" 2>&1 | tee -a "${LOG_FILE}"
+    if [ "${PIPESTATUS[0]}" -ne 0 ]; then
+        error_msg "Warning" "Failed to create some HDD-OSD icons. See ${LOG_FILE} for details." "Those games will use the default icon."
+    fi
+
     cp "${ICONS_DIR}/ico/tmp/"*.ico "${ICONS_DIR}/ico/" >/dev/null 2>&1
 
     echo | tee -a "${LOG_FILE}"
     echo "Creating Assets for Games:"  | tee -a "${LOG_FILE}"
 
-    # Read the file line by line
-
-    exec 3< "$ALL_GAMES"
-    while IFS='|' read -r title game_id publisher disc_type file_name <&3; do
-        echo | tee -a "${LOG_FILE}"
-        echo "Processing $title..." 
-        title_id=$(echo "$game_id" | sed -E 's/_(...)\./-\1/;s/\.//')
-        # Create a sub-folder named after the game_id
-        game_dir="$ICONS_DIR/$game_id"
-        mkdir -p "$game_dir" 2>>"${LOG_FILE}" || error_msg "Error" "Failed to create $dir."
-
-        cp "${ASSETS_DIR}/BBNL"/{boot.kelf,system.cnf} "${game_dir}" 2>> "${LOG_FILE}" || error_msg "Error" "Failed to create boot.kelf, or system.cnf. See ${LOG_FILE} for details."
-        echo "Created: $game_dir/boot.kelf" | tee -a "${LOG_FILE}"
-        echo "Created: $game_dir/system.cnf" | tee -a "${LOG_FILE}"
-
-        # Generate the info.sys file
-        info_sys_filename="$game_dir/info.sys"
-        create_info_sys "$title" "$title_id" "$publisher"
-
-        if [ ${#title} -gt 48 ]; then
-            game_title_icon="${title:0:45}..."
-        else
-            game_title_icon="$title"
-        fi
-
-        # Generate the icon.sys file
-        icon_sys_filename="$game_dir/icon.sys"
-        create_icon_sys "$game_title_icon" "$publisher"
-
-        # Copy the matching .png file and rename it to jkt_001.png
-        png_file="${TOOLKIT_PATH}/icons/art/${game_id}.png"
-        if [[ -s "$png_file" ]]; then
-            cp "$png_file" "${game_dir}/jkt_001.png" 2>> "${LOG_FILE}" || error_msg "Error" "Failed to create $game_dir/jkt_001.png. See ${LOG_FILE} for details."
-            echo "Created: $game_dir/jkt_001.png"  | tee -a "${LOG_FILE}"
-        else
-            echo "$game_id $title" >> "${MISSING_ART}"
-            if [[ "$disc_type" == "POPS" ]]; then
-                cp "${TOOLKIT_PATH}/icons/art/ps1.png" "${game_dir}/jkt_001.png" 2>> "${LOG_FILE}" || error_msg "Error" "Failed to create $game_dir/jkt_001.png. See ${LOG_FILE} for details."
-                echo "Created: $game_dir/jkt_001.png using default PS1 image." | tee -a "${LOG_FILE}"
-            else
-                cp "${TOOLKIT_PATH}/icons/art/ps2.png" "${game_dir}/jkt_001.png" 2>> "${LOG_FILE}" || error_msg "Error" "Failed to create $game_dir/jkt_001.png. See ${LOG_FILE} for details."
-                echo "Created: $game_dir/jkt_001.png using default PS2 image." | tee -a "${LOG_FILE}"
-            fi
-        fi
-
-        ico_file="${ICONS_DIR}/ico/$game_id.ico"
-
-        if [[ -f "$ico_file" ]]; then
-            cp "${ICONS_DIR}/ico/$game_id.ico" "${game_dir}/list.ico" 2>> "${LOG_FILE}" || error_msg "Error" "Failed to create $game_dir/list.ico. See ${LOG_FILE} for details."
-            echo "Created: $game_dir/list.ico"
-        else
-            echo "$game_id $title" >> "${MISSING_ICON}"
-            case "$disc_type" in
-            DVD)
-                cp "${ICONS_DIR}/ico/dvd.ico" "${game_dir}/list.ico" 2>> "${LOG_FILE}" || error_msg "Error" "Failed to create $game_dir/list.ico. See ${LOG_FILE} for details."
-                echo "Created: $game_dir/list.ico using default DVD icon." | tee -a "${LOG_FILE}"
-            ;;
-            CD)
-                cp "${ICONS_DIR}/ico/cd.ico" "${game_dir}/list.ico" 2>> "${LOG_FILE}" || error_msg "Error" "Failed to create $game_dir/list.ico. See ${LOG_FILE} for details."
-                echo "Created: $game_dir/list.ico using default CD icon." | tee -a "${LOG_FILE}"
-            ;;
-            POPS)
-                cp "${ICONS_DIR}/ico/ps1.ico" "${game_dir}/list.ico" 2>> "${LOG_FILE}" || error_msg "Error" "Failed to create $game_dir/list.ico. See ${LOG_FILE} for details."
-                echo "Created: $game_dir/list.ico using default PS1 icon." | tee -a "${LOG_FILE}"
-            ;;
-            esac
-        fi
-
-        PP_NAME
-        # Generate the BBNL cfg file
-        # Determine the launcher value for this specific game
-        if [[ "$disc_type" == "POPS" ]]; then
-            launcher_value="POPS"
-        else
-            launcher_value="$LAUNCHER"
-        fi
-        bbnl_label="${PARTITION_LABEL:3}"
-        bbnl_cfg="${ICONS_DIR}/bbnl/$bbnl_label.cfg"
-        cat > "$bbnl_cfg" <<EOL
-file_name=$file_name
-title_id=$game_id
-disc_type=$disc_type
-launcher=$launcher_value
-EOL
-
-    echo "Created: $bbnl_cfg"  | tee -a "${LOG_FILE}"
-
-    done
-    exec 3<&-
+    # Labels, info.sys, icon.sys, artwork, icons and BBNL cfg files for all games in one pass
+    python3 -u "${HELPER_DIR}/partition_metadata.py" -m "${TOOLKIT_PATH}/partitions.list" -a "${MISSING_ART}" -i "${MISSING_ICON}" \
+        "${ALL_GAMES}" "${ICONS_DIR}" "${ASSETS_DIR}" "$LAUNCHER" 2>&1 | tee -a "${LOG_FILE}"
+    if [ "${PIPESTATUS[0]}" -ne 0 ]; then
+        error_msg "Error" "Failed to create game assets. See ${LOG_FILE} for details."
+    fi
+    cat "${TOOLKIT_PATH}/partitions.list" >> "${LOG_FILE}"
 
 else
     echo | tee -a "${LOG_FILE}"
@@ -2107,59 +1904,17 @@ fi
 
 if [ -f "$ALL_GAMES" ]; then
 
-    # Read all lines in reverse order
-    mapfile -t reversed_lines < <(tac "$ALL_GAMES")
-
     echo | tee -a "${LOG_FILE}"
     echo "Creating BBNL Partitions for Games:" | tee -a "${LOG_FILE}"
-    i=0
-
-    # Reverse the lines of the file using tac and process each line
-    for line in "${reversed_lines[@]}"; do
-        IFS='|' read -r title game_id publisher disc_type file_name <<< "$line"
-
-        APA_SIZE_CHECK
-
-        # Check the value of available
-        if [ "$available" -lt 8 ]; then
-            error_msg "Warning" "Insufficient space for another partition."
-            break
-        fi
-
-        PP_NAME
-
-        COMMANDS="device ${DEVICE}\n"
-        COMMANDS+="mkpart ${PARTITION_LABEL} 8M PFS\n"
-        COMMANDS+="mount ${PARTITION_LABEL}\n"
-        COMMANDS+="cd /\n"
 
-        # Navigate into the sub-directory named after the gameid
-        COMMANDS+="lcd '${ICONS_DIR}/${game_id}'\n"
-        COMMANDS+="mkdir res\n"
-        COMMANDS+="cd res\n"
-        COMMANDS+="put info.sys\n"
-        COMMANDS+="put jkt_001.png\n"
+    APA_SIZE_CHECK
 
-        if [[ "$disc_type" == "POPS" ]]; then
-            COMMANDS+="lcd '${ASSETS_DIR}/POPStarter'\n"
-            COMMANDS+="put 1.png\n"
-            COMMANDS+="put 2.png\n"
-            COMMANDS+="put bg.png\n"
-            COMMANDS+="put man.xml\n"
-        fi
-
-        COMMANDS+="umount\n"
-        COMMANDS+="exit\n"
-
-        PFS_COMMANDS
-
-        cd "${ICONS_DIR}/$game_id" 2>>"${LOG_FILE}" || error_msg "Error" "Failed to navigate to ${ICONS_DIR}/$game_id."
-        sudo "${HELPER_DIR}/HDL Dump.elf" modify_header "${DEVICE}" "${PARTITION_LABEL}" >> "${LOG_FILE}" 2>&1 || error_msg "Error" "Failed to modify header of ${PARTITION_LABEL}."
-        echo "Created $PARTITION_LABEL" | tee -a "${LOG_FILE}"
-        echo >> "${LOG_FILE}"
-
-        ((i++))
-    done
+    # Create every game partition in a single PFS Shell session, in reverse order of master.list
+    # pfs-batch.py writes its messages to the log itself, in order with the PFS Shell output
+    if ! sudo python3 -u "${HELPER_DIR}/pfs-batch.py" -a "$available" -l "${LOG_FILE}" \
+        "${DEVICE}" "${ALL_GAMES}" "${ICONS_DIR}" "${ASSETS_DIR}" 2>>"${LOG_FILE}"; then
+        error_msg "Error" "Failed to create BBNL partitions for games. See ${LOG_FILE} for details."
+    fi
 fi
 
 ################################### Submit missing artwork to the PSBBN Art Database ###################################
@@ -2203,6 +1958,9 @@ HDL_TOC
 cat "$hdl_output" >> "${LOG_FILE}"
 rm -f "$hdl_output"
 
+# Deactivate the virtual environment
+deactivate
+
 echo | tee -a "${LOG_FILE}"
 echo "Game installer script complete." | tee -a "${LOG_FILE}"
 echo
@@ -0,0 +1,249 @@
+import sys
+import os
+import mmap
+import struct
+import json
+from getopt import gnu_getopt, GetoptError
+
+# Read-only APA partition table and PFS directory reader for PS2 drives and drive images
+
+SECTOR_SIZE = 512
+APA_MAGIC = 0x00415041  # "APA\0"
+APA_FLAG_SUB = 0x0001
+APA_TYPE_FREE = 0x0000
+APA_TYPE_PFS = 0x0100
+APA_MAX_SUBS = 64
+
+PFS_SUPER_MAGIC = 0x50465300
+PFS_SUPER_SECTOR = 8192
+PFS_INODE_MAGIC = 0x53454744  # "SEGD"
+PFS_INODE_DATA_SEGMENTS = 114
+FIO_S_IFMT = 0xF000
+FIO_S_IFDIR = 0x1000
+
+class APAError(Exception):
+    pass
+
+class Partition:
+    def __init__(self, data, sector):
+        (magic, self.next, self.prev) = struct.unpack_from('<4xIII', data, sector * SECTOR_SIZE)
+        if magic != APA_MAGIC:
+            raise APAError(f"No APA header at sector {sector}")
+        base = sector * SECTOR_SIZE
+        self.id = bytes(data[base + 0x10:base + 0x30]).split(b'\x00')[0].decode('ascii', errors='replace')
+        self.start, self.length, self.type, self.flags, self.nsub = struct.unpack_from('<IIHHI', data, base + 0x40)
+        self.main = struct.unpack_from('<I', data, base + 0x58)[0]
+        self.subs = [struct.unpack_from('<II', data, base + 0x200 + i * 8) for i in range(min(self.nsub, APA_MAX_SUBS))]
+
+    @property
+    def is_sub(self):
+        return bool(self.flags & APA_FLAG_SUB)
+
+    @property
+    def size_mb(self):
+        return self.length * SECTOR_SIZE // (1024 * 1024)
+
+    def as_dict(self):
+        return {
+            "name": self.id,
+            "type": self.type,
+            "start": self.start,
+            "size_mb": self.size_mb,
+            "sub": self.is_sub,
+        }
+
+class Drive:
+    def __init__(self, path):
+        self.fd = os.open(path, os.O_RDONLY)
+        try:
+            self.size = os.lseek(self.fd, 0, os.SEEK_END)
+            # A block device has st_size 0, mmap only maps it when given the length
+            self.data = mmap.mmap(self.fd, self.size, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            os.close(self.fd)
+            raise
+        self.partitions = self.read_partitions()
+
+    def close(self):
+        self.data.close()
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def read_partitions(self):
+        # Walk the linked list of APA headers starting from __mbr at sector 0
+        partitions = []
+        sector = 0
+        seen = set()
+        while sector not in seen:
+            seen.add(sector)
+            if (sector + 2) * SECTOR_SIZE > self.size:
+                raise APAError(f"APA header at sector {sector} is beyond the end of the drive")
+            partition = Partition(self.data, sector)
+            partitions.append(partition)
+            sector = partition.next
+        return partitions
+
+    def find(self, name):
+        for partition in self.partitions:
+            if partition.id == name and not partition.is_sub:
+                return partition
+        raise APAError(f"Partition {name} not found")
+
+    def used_mb(self):
+        # Everything except free (unnamed) partitions, as reported by HDL Dump toc
+        return sum(p.size_mb for p in self.partitions if p.type != APA_TYPE_FREE)
+
+    def total_mb(self):
+        return self.size // (1024 * 1024)
+
+    def pfs(self, name):
+        return PFS(self, self.find(name))
+
+class PFS:
+    def __init__(self, drive, partition):
+        self.data = drive.data
+        # Sub-partition 0 is the main partition, the others are listed in its APA header
+        self.offsets = [partition.start * SECTOR_SIZE] + [start * SECTOR_SIZE for start, _ in partition.subs]
+        base = self.offsets[0] + PFS_SUPER_SECTOR * SECTOR_SIZE
+        magic, self.zone_size = struct.unpack_from('<I12xI', self.data, base)
+        if magic != PFS_SUPER_MAGIC:
+            raise APAError(f"{partition.id} is not formatted with PFS")
+        self.root = struct.unpack_from('<IH', self.data, base + 32)
+
+    def zone_offset(self, number, subpart):
+        return self.offsets[subpart] + number * self.zone_size
+
+    def inode(self, number, subpart):
+        base = self.zone_offset(number, subpart)
+        magic = struct.unpack_from('<I', self.data, base + 4)[0]
+        if magic != PFS_INODE_MAGIC:
+            raise APAError(f"Bad inode at zone {number} of sub-partition {subpart}")
+        mode = struct.unpack_from('<H', self.data, base + 952)[0]
+        size, number_blocks, number_data = struct.unpack_from('<QII', self.data, base + 984)
+        segments = [struct.unpack_from('<IHH', self.data, base + 40 + i * 8)
+                    for i in range(min(number_data, PFS_INODE_DATA_SEGMENTS))]
+        return {"mode": mode, "size": size, "number_data": number_data, "segments": segments}
+
+    def read_data(self, inode):
+        # Data starts in segment 1, or right after the inode in segment 0 when there is no segment 1
+        if inode["number_data"] > PFS_INODE_DATA_SEGMENTS:
+            raise APAError("Files with chained segment descriptors are not supported")
+        remaining = inode["size"]
+        chunks = []
+        for index, (number, subpart, count) in enumerate(inode["segments"]):
+            if index == 0:
+                if len(inode["segments"]) > 1 and inode["segments"][1][2]:
+                    continue
+                number, count = number + 1, count - 1
+            start = self.zone_offset(number, subpart)
+            length = min(remaining, count * self.zone_size)
+            chunks.append(self.data[start:start + length])
+            remaining -= length
+            if remaining <= 0:
+                break
+        return b"".join(chunks)
+
+    def listdir(self, path="/"):
+        number, subpart = self.root
+        for name in [part for part in path.split("/") if part]:
+            for entry in self.listdir_inode(number, subpart):
+                if entry["name"] == name and entry["dir"]:
+                    number, subpart = entry["inode"], entry["sub"]
+                    break
+            else:
+                raise APAError(f"Directory {path} not found")
+        return [entry for entry in self.listdir_inode(number, subpart) if entry["name"] not in (".", "..")]
+
+    def listdir_inode(self, number, subpart):
+        data = self.read_data(self.inode(number, subpart))
+        entries = []
+        # Directory entries never cross a 512-byte boundary
+        for block in range(0, len(data), SECTOR_SIZE):
+            pos = block
+            while pos < block + SECTOR_SIZE and pos + 8 <= len(data):
+                inode_number, sub, path_length, a_length = struct.unpack_from('<IBBH', data, pos)
+                length = a_length & 0x0FFF
+                if length == 0:
+                    break
+                if inode_number:
+                    name = data[pos + 8:pos + 8 + path_length].decode('utf-8', errors='replace')
+                    entries.append({
+                        "name": name,
+                        "inode": inode_number,
+                        "sub": sub,
+                        "dir": (a_length & FIO_S_IFMT) == FIO_S_IFDIR,
+                    })
+                pos += length
+        for entry in entries:
+            if entry["name"] not in (".", ".."):
+                entry["size"] = self.inode(entry["inode"], entry["sub"])["size"]
+        return entries
+
+def summary(drive):
+    return {
+        "total_mb": drive.total_mb(),
+        "used_mb": drive.used_mb(),
+        "free_mb": drive.total_mb() - drive.used_mb(),
+        "partitions": [p.as_dict() for p in drive.partitions],
+    }
+
+def installed(drive):
+    # Games already on the drive: PP.* partitions and the VCDs in __.POPS
+    result = {
+        "pp": [p.id for p in drive.partitions if p.id.startswith("PP.") and not p.is_sub],
+        "vcd": [],
+    }
+    try:
+        entries = drive.pfs("__.POPS").listdir("/")
+    except APAError:
+        entries = []
+    result["vcd"] = [{"name": e["name"], "size": e["size"]} for e in entries
+                     if not e["dir"] and e["name"].lower().endswith(".vcd")]
+    return result
+
+def usage():
+    print("Usage: apa_reader.py [options] <device|image>")
+    print("  (no option)     Print a partition table like HDL Dump toc")
+    print("  --json          Print partitions, sizes, free space and installed games as JSON")
+    print("  --used          Print the used space in MB")
+    print("  --ls partition  List the root of a PFS partition, -l to include sizes")
+
+if __name__ == "__main__":
+    try:
+        optlist, args = gnu_getopt(sys.argv[1:], "lh", ["json", "used", "ls="])
+    except GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(1)
+
+    options = dict(optlist)
+    if "-h" in options or len(args) != 1:
+        usage()
+        sys.exit(0 if "-h" in options else 1)
+
+    try:
+        with Drive(args[0]) as drive:
+            if "--json" in options:
+                print(json.dumps({**summary(drive), **installed(drive)}, indent=2))
+            elif "--used" in options:
+                print(drive.used_mb())
+            elif "--ls" in options:
+                for entry in drive.pfs(options["--ls"]).listdir("/"):
+                    name = entry["name"] + ("/" if entry["dir"] else "")
+                    if "-l" in options:
+                        print(f"{'d' if entry['dir'] else '-'} {entry['size']} {name}")
+                    else:
+                        print(name)
+            else:
+                for p in drive.partitions:
+                    if p.type != APA_TYPE_FREE:
+                        print(f"0x{p.type:04x} {p.size_mb:>8}MB {p.id}")
+                print(f"Total: {drive.total_mb()} MB, used: {drive.used_mb()} MB, available: {drive.total_mb() - drive.used_mb()} MB")
+    except (OSError, ValueError, struct.error, APAError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
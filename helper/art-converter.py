@@ -0,0 +1,139 @@
+import sys
+import os
+import hashlib
+import shutil
+from multiprocessing import Pool
+
+from PIL import Image
+
+ART_SIZE = 256
+CROP_TOP = 44
+# Bump when the conversion rules change so cached results are not reused
+RULES_VERSION = b"art-256-v1"
+
+# Function to derive the cache key from the source image bytes
+def cache_key(path):
+    digest = hashlib.sha256(RULES_VERSION)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Function to convert a single image in memory, returns the resulting image or None if too small
+def convert_image(path):
+    with Image.open(path) as img:
+        width, height = img.size
+
+        # Check if width >= 256 and height >= width
+        if width < ART_SIZE or height < width:
+            return None, "Skipping {}: does not meet size requirements".format(path)
+
+        if width == height:
+            # Square: Resize without cropping
+            target = (ART_SIZE, ART_SIZE)
+            message = "Resizing square image {}".format(path)
+        else:
+            # Not square: Resize so the width is 256, then crop 256x256 starting 44 pixels down
+            target = (ART_SIZE, round(height * ART_SIZE / width))
+            message = "Resizing and cropping {}".format(path)
+
+        # Let the JPEG decoder downscale while decoding, never below the target size
+        img.draft("RGB", target)
+        if img.mode in ("I", "I;16", "I;16B", "F"):
+            img = img.point(lambda v: v / 256).convert("L")
+        # -alpha off: drop the alpha channel without compositing, -depth 8: 8 bits per channel
+        img = img.convert("RGB").resize(target, Image.LANCZOS)
+
+        if target[1] != ART_SIZE:
+            img = img.crop((0, CROP_TOP, ART_SIZE, min(CROP_TOP + ART_SIZE, target[1])))
+
+        return img, message
+
+# Function to process one file from the input directory, using the cache when possible
+def process_file(args):
+    path, cache_dir = args
+    output = os.path.splitext(path)[0] + ".png"
+
+    try:
+        key = cache_key(path)
+        cached = os.path.join(cache_dir, key + ".png")
+        skipped = os.path.join(cache_dir, key + ".skip")
+
+        if os.path.isfile(cached):
+            shutil.copyfile(cached, output + ".tmp")
+            os.replace(output + ".tmp", output)
+            message = "Using cached conversion for {}".format(path)
+            result = True
+        elif os.path.isfile(skipped):
+            message = "Skipping {}: does not meet size requirements".format(path)
+            result = False
+        else:
+            img, message = convert_image(path)
+            if img is None:
+                open(skipped, "w").close()
+                result = False
+            else:
+                tmp = "{}.{}.tmp".format(cached, os.getpid())
+                img.save(tmp, format="PNG")
+                os.replace(tmp, cached)
+                shutil.copyfile(cached, output + ".tmp")
+                os.replace(output + ".tmp", output)
+                result = True
+    except Exception as e:
+        message = "Skipping {}: {}".format(path, e)
+        result = False
+
+    # The source image is no longer needed, unless it is also the output
+    if not (result and os.path.abspath(path) == os.path.abspath(output)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    return result, message
+
+def convert_artwork(input_dir, cache_dir, processes=None):
+    os.makedirs(cache_dir, exist_ok=True)
+
+    files = sorted(
+        os.path.join(input_dir, name) for name in os.listdir(input_dir)
+        if not name.startswith('.') and os.path.isfile(os.path.join(input_dir, name))
+    )
+    if not files:
+        print("No artwork to convert in", input_dir)
+        return 0
+
+    # Several sources for the same game would all write to one .png, keep the last one like the serial loop did
+    by_output = {}
+    for path in files:
+        by_output[os.path.splitext(path)[0]] = path
+    for path in set(files) - set(by_output.values()):
+        os.remove(path)
+    files = sorted(by_output.values())
+
+    converted = 0
+    with Pool(processes) as pool:
+        for result, message in pool.imap_unordered(process_file, [(path, cache_dir) for path in files]):
+            print(message)
+            if result:
+                converted += 1
+
+    print("Converted {} of {} images.".format(converted, len(files)))
+    return converted
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: art-converter.py <input_dir> [cache_dir]")
+        sys.exit(1)
+
+    input_dir = sys.argv[1]
+    if len(sys.argv) == 3:
+        cache_dir = sys.argv[2]
+    else:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(input_dir)), "cache")
+
+    if not os.path.isdir(input_dir):
+        print("Error: {} not found.".format(input_dir))
+        sys.exit(1)
+
+    convert_artwork(input_dir, cache_dir)
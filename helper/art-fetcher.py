@@ -0,0 +1,224 @@
+import sys
+import os
+import json
+import time
+import threading
+import http.client
+from urllib.parse import urlsplit, urljoin, quote
+from concurrent.futures import ThreadPoolExecutor
+from getopt import gnu_getopt, GetoptError
+
+OPL_ART = "https://archive.org/download/OPLM_ART_2024_09/OPLM_ART_2024_09.zip"
+
+# Artwork sources: default base URL, path under the base URL, output file name, platforms included
+# and a file of another kind that must already be in the output folder
+KINDS = {
+    "psbbn": ("https://raw.githubusercontent.com/CosmicScale/psbbn-art-database/main", "art/{id}.png", "{id}.png", ("PS1", "PS2"), None),
+    "opl": (OPL_ART, "PS2/{id}/{id}_COV.png", "{id}_COV.png", ("PS2",), None),
+    "ico": ("https://raw.githubusercontent.com/CosmicScale/HDD-OSD-Icon-Database/main", "ico/{id}.ico", "{id}.ico", ("PS1", "PS2"), None),
+    # Cover, back cover and disc label that ps2iconmaker.py builds an HDD-OSD icon from
+    "ps1-cov": (OPL_ART, "PS1/{id}/{id}_COV.png", "{id}_COV.png", ("PS1",), None),
+    "ps2-cov": (OPL_ART, "PS2/{id}/{id}_COV.png", "{id}_COV.png", ("PS2",), None),
+    "ps1-cov2": (OPL_ART, "PS1/{id}/{id}_COV2.png", "{id}_COV2.png", ("PS1",), "{id}_COV.png"),
+    "ps2-cov2": (OPL_ART, "PS2/{id}/{id}_COV2.png", "{id}_COV2.png", ("PS2",), "{id}_COV.png"),
+    "ps1-lab": (OPL_ART, "PS1/{id}/{id}_LAB.png", "{id}_LAB.png", ("PS1",), "{id}_COV.png"),
+    "ps2-lab": (OPL_ART, "PS2/{id}/{id}_LAB.png", "{id}_LAB.png", ("PS2",), "{id}_COV.png"),
+}
+
+DEFAULT_JOBS = 8
+DEFAULT_TTL_DAYS = 7
+TIMEOUT = 10
+TRIES = 3
+MAX_REDIRECTS = 5
+
+# Keep-alive connections, one per host for each worker thread
+local = threading.local()
+
+class Miss(Exception):
+    pass
+
+def get_connection(scheme, host):
+    pool = getattr(local, "pool", None)
+    if pool is None:
+        pool = local.pool = {}
+    conn = pool.get((scheme, host))
+    if conn is None:
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, timeout=TIMEOUT)
+        else:
+            conn = http.client.HTTPConnection(host, timeout=TIMEOUT)
+        pool[(scheme, host)] = conn
+    return conn
+
+def drop_connection(scheme, host):
+    conn = local.pool.pop((scheme, host), None)
+    if conn is not None:
+        conn.close()
+
+def fetch(url):
+    # Return the body of url, raise Miss if the server says it does not exist
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        for attempt in range(TRIES):
+            conn = get_connection(parts.scheme, parts.netloc)
+            try:
+                conn.request("GET", path, headers={"User-Agent": "PSBBN-Game-Installer"})
+                response = conn.getresponse()
+                body = response.read()
+                break
+            except (OSError, http.client.HTTPException):
+                drop_connection(parts.scheme, parts.netloc)
+                if attempt == TRIES - 1:
+                    raise
+        if response.will_close:
+            drop_connection(parts.scheme, parts.netloc)
+
+        if response.status in (301, 302, 303, 307, 308) and response.getheader("Location"):
+            url = urljoin(url, response.getheader("Location"))
+            continue
+        if response.status in (404, 410):
+            raise Miss(url)
+        if response.status != 200:
+            raise http.client.HTTPException(f"HTTP {response.status} for {url}")
+        if not body:
+            raise Miss(url)
+        return body
+    raise http.client.HTTPException(f"Too many redirects for {url}")
+
+def load_negative_cache(path, ttl):
+    try:
+        with open(path, "r") as f:
+            misses = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    now = time.time()
+    return {url: stamp for url, stamp in misses.items() if now - stamp < ttl}
+
+def save_negative_cache(path, misses):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(misses, f, indent=0, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def read_game_ids(games_list_path, platforms):
+    game_ids = []
+    with open(games_list_path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("|")
+            if len(fields) < 4 or not fields[1]:
+                continue
+            if ("PS1" if fields[3] == "POPS" else "PS2") not in platforms:
+                continue
+            if fields[1] not in game_ids:
+                game_ids.append(fields[1])
+    return game_ids
+
+def fetch_artwork(kind, games_list_path, output_dir, base_url=None, jobs=DEFAULT_JOBS, cache_path=None, ttl=DEFAULT_TTL_DAYS * 86400, skip=None):
+    # skip is a path with {id}, games for which it exists are left out
+    default_base, url_path, file_name, platforms, requires = KINDS[kind]
+    base_url = (base_url or default_base).rstrip("/")
+    misses = load_negative_cache(cache_path, ttl) if cache_path else {}
+    lock = threading.Lock()
+    os.makedirs(output_dir, exist_ok=True)
+
+    def fetch_one(game_id):
+        output = os.path.join(output_dir, file_name.format(id=game_id))
+        if os.path.isfile(output) and os.path.getsize(output) > 0:
+            return game_id, "exists"
+        if requires and not os.path.isfile(os.path.join(output_dir, requires.format(id=game_id))):
+            return game_id, "skipped"
+        url = base_url + "/" + quote(url_path.format(id=game_id))
+        if url in misses:
+            return game_id, "cached-miss"
+        try:
+            data = fetch(url)
+        except Miss:
+            with lock:
+                misses[url] = time.time()
+            return game_id, "miss"
+        except (OSError, http.client.HTTPException) as e:
+            return game_id, f"error: {e}"
+        with open(output + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(output + ".tmp", output)
+        return game_id, "downloaded"
+
+    results = {}
+    game_ids = read_game_ids(games_list_path, platforms)
+    if skip:
+        game_ids = [game_id for game_id in game_ids if not os.path.isfile(skip.format(id=game_id))]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for game_id, status in executor.map(fetch_one, game_ids):
+            results[game_id] = status
+            if status == "skipped":
+                continue
+            if status == "exists":
+                print(f"Artwork for {game_id} already exists. Skipping download.")
+            elif status == "downloaded":
+                print(f"Successfully downloaded artwork for {game_id}")
+            elif status == "cached-miss":
+                print(f"Artwork for {game_id} is known to be missing. Skipping download.")
+            elif status == "miss":
+                print(f"Artwork for {game_id} not found")
+            else:
+                print(f"Failed to download artwork for {game_id}: {status[7:]}")
+
+    if cache_path:
+        save_negative_cache(cache_path, misses)
+
+    downloaded = sum(1 for status in results.values() if status == "downloaded")
+    missing = sum(1 for status in results.values() if status not in ("exists", "downloaded", "skipped"))
+    tried = sum(1 for status in results.values() if status != "skipped")
+    print(f"{kind}: downloaded {downloaded}, missing {missing}, of {tried} games.")
+    return results
+
+def usage():
+    print("Usage: art-fetcher.py [options] <kind>[,<kind>...] <master.list> <output_dir>")
+    print("  Kinds: %s, fetched one after the other" % ", ".join(KINDS))
+    print("  -j jobs      Number of parallel downloads (default %d)" % DEFAULT_JOBS)
+    print("  -b url       Base URL of the artwork source")
+    print("  -c file      Negative cache of known misses (JSON)")
+    print("  -t days      Days before a known miss is retried (default %d)" % DEFAULT_TTL_DAYS)
+    print("  -m file      Write the IDs of games still without artwork to file")
+    print("  -a file      Only write IDs found in this ArtDB.csv to the -m file")
+    print("  -s path      Skip games for which path exists, {id} is replaced with the game ID")
+
+if __name__ == "__main__":
+    try:
+        optlist, args = gnu_getopt(sys.argv[1:], "j:b:c:t:m:a:s:h")
+    except GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(1)
+
+    options = dict(optlist)
+    kinds = args[0].split(",") if args else []
+    if "-h" in options or len(args) != 3 or not kinds or any(kind not in KINDS for kind in kinds):
+        usage()
+        sys.exit(0 if "-h" in options else 1)
+
+    games_list_path, output_dir = args[1:]
+    # Kinds run in order, so a cover fetched by one is there for the kinds that require it
+    results = {}
+    for kind in kinds:
+        for game_id, status in fetch_artwork(
+            kind, games_list_path, output_dir,
+            base_url=options.get("-b"),
+            jobs=int(options.get("-j", DEFAULT_JOBS)),
+            cache_path=options.get("-c"),
+            ttl=float(options.get("-t", DEFAULT_TTL_DAYS)) * 86400,
+            skip=options.get("-s"),
+        ).items():
+            if results.get(game_id) not in ("exists", "downloaded"):
+                results[game_id] = status
+
+    if "-m" in options:
+        missing = [game_id for game_id, status in results.items() if status not in ("exists", "downloaded", "skipped")]
+        if "-a" in options:
+            with open(options["-a"], "r") as f:
+                known = {line.split("|", 1)[0] for line in f}
+            missing = [game_id for game_id in missing if game_id in known]
+        with open(options["-m"], "w") as f:
+            for game_id in missing:
+                f.write(game_id + "\n")
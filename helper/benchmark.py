@@ -0,0 +1,333 @@
+import sys
+import os
+import json
+import time
+import random
+import shutil
+import struct
+import platform
+import tempfile
+import subprocess
+from multiprocessing import Pool
+from getopt import gnu_getopt, GetoptError
+
+from icon_sys_to_txt import parse_icon_txt, encode_icon_sys
+from partition_metadata import ICON_SYS
+
+# Times the Python helpers on a generated corpus and records MB/s, items/s and peak RSS as JSON
+
+HELPER_DIR = os.path.dirname(os.path.abspath(__file__))
+TOOLKIT_PATH = os.path.dirname(HELPER_DIR)
+SECTOR_SIZE = 2048
+VCD_HEADER_SIZE = 0x100000
+MB = 1024 * 1024
+
+DEFAULT_GAMES = 20
+DEFAULT_ISO_MB = 8
+DEFAULT_VCDS = 5
+DEFAULT_VCD_MB = 4
+DEFAULT_ICONS = 500
+DEFAULT_LIST_LINES = 10000
+DEFAULT_ZSO_MB = 64
+ZSO_SETTINGS = [(1, 2048), (9, 2048), (12, 2048), (9, 8192)]
+
+WORDS = ["Final", "Metal", "Gear", "Solid", "Grand", "Theft", "Auto", "Ratchet", "Clank", "Jak", "Daxter",
+         "Kingdom", "Hearts", "Silent", "Hill", "Shadow", "Colossus", "Okami", "Katamari", "Damacy", "Ōkami",
+         "Crash", "Bandicoot", "Spyro", "Dragon", "Quest", "Tekken", "Soulcalibur", "Burnout", "Pokémon"]
+PUBLISHERS = ["Sony Computer Entertainment", "Konami", "Square Enix", "Namco", "Capcom", "Electronic Arts", ""]
+PREFIXES = ["SLUS", "SLES", "SCUS", "SCES", "SLPM", "SLPS"]
+
+def game_id(number, prefix=None):
+    prefix = prefix or PREFIXES[number % len(PREFIXES)]
+    return f"{prefix}_{200 + number // 100:03d}.{number % 100:02d}"
+
+def game_title(rng):
+    title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5)))
+    if rng.random() < 0.2:
+        title += f" {rng.choice(['2', '3', '²', '³', 'II'])}"
+    if rng.random() < 0.1:
+        title += f" (Disc {rng.randint(1, 3)})"
+    return title
+
+def both_endian(fmt, value):
+    # ISO9660 stores most numbers twice, little-endian then big-endian
+    return struct.pack('<' + fmt, value) + struct.pack('>' + fmt, value)
+
+def dir_record(name, extent, size, flags=0):
+    # ISO9660 directory record, the volume sequence number is followed by the name length (01 0D for IDs)
+    name = name.encode('ascii')
+    length = 33 + len(name) + (1 - len(name) % 2)
+    record = bytes([length, 0]) + both_endian('I', extent) + both_endian('I', size)
+    record += bytes(7) + bytes([flags, 0, 0]) + both_endian('H', 1) + bytes([len(name)]) + name
+    return record + bytes(length - len(record))
+
+def fill_data(rng, size):
+    # Mix of incompressible, compressible and zero regions, like real disc images
+    chunks = []
+    while size > 0:
+        length = min(size, MB)
+        kind = rng.random()
+        if kind < 0.4:
+            chunks.append(rng.randbytes(length))
+        elif kind < 0.7:
+            text = " ".join(rng.choice(WORDS) for _ in range(64)).encode('utf-8')
+            chunks.append((text * (length // len(text) + 1))[:length])
+        else:
+            chunks.append(bytes(length))
+        size -= length
+    return b"".join(chunks)
+
+def iso_image(rng, identifier, size):
+    # Minimal ISO9660 volume with SYSTEM.CNF and the game ELF in the root directory
+    system_cnf = f"BOOT2 = cdrom0:\\{identifier};1\r\nVER = 1.00\r\nVIDEO_MODE = NTSC\r\n".encode('ascii')
+    sectors = max(size // SECTOR_SIZE, 32)
+    image = bytearray(fill_data(rng, sectors * SECTOR_SIZE))
+    image[:20 * SECTOR_SIZE] = bytes(20 * SECTOR_SIZE)
+
+    pvd = bytearray(SECTOR_SIZE)
+    pvd[0:7] = b"\x01CD001\x01"
+    pvd[40:72] = identifier.ljust(32).encode('ascii')
+    pvd[80:88] = both_endian('I', sectors)
+    pvd[120:124] = both_endian('H', 1)
+    pvd[124:128] = both_endian('H', 1)
+    pvd[128:132] = both_endian('H', SECTOR_SIZE)
+    pvd[156:190] = dir_record("\x00", 18, SECTOR_SIZE, 2)
+    image[16 * SECTOR_SIZE:17 * SECTOR_SIZE] = pvd
+    image[17 * SECTOR_SIZE:17 * SECTOR_SIZE + 7] = b"\xffCD001\x01"
+
+    root = dir_record("\x00", 18, SECTOR_SIZE, 2) + dir_record("\x01", 18, SECTOR_SIZE, 2)
+    root += dir_record(f"{identifier};1", 20, SECTOR_SIZE) + dir_record("SYSTEM.CNF;1", 19, len(system_cnf))
+    image[18 * SECTOR_SIZE:18 * SECTOR_SIZE + len(root)] = root
+    image[19 * SECTOR_SIZE:19 * SECTOR_SIZE + len(system_cnf)] = system_cnf
+    return bytes(image)
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+def generate_corpus(work, rng, games, iso_mb, vcds, vcd_mb, icons, list_lines, zso_mb):
+    corpus = {"games": games, "iso_mb": iso_mb, "vcds": vcds, "vcd_mb": vcd_mb,
+              "icons": icons, "list_lines": list_lines, "zso_mb": zso_mb}
+
+    # Half the images are named after their ID, the others have to be scanned for it
+    for number in range(games):
+        identifier = game_id(number)
+        folder = "DVD" if number % 3 else "CD"
+        name = f"{identifier}.{game_title(rng)}.iso" if number % 2 else f"{game_title(rng)} {number}.iso"
+        write_file(os.path.join(work, "games", folder, name), iso_image(rng, identifier, iso_mb * MB))
+
+    for number in range(vcds):
+        identifier = game_id(number, "SLUS")
+        disc = iso_image(rng, identifier, vcd_mb * MB - VCD_HEADER_SIZE)
+        write_file(os.path.join(work, "games", "POPS", f"{game_title(rng)} {number}.VCD"), bytes(VCD_HEADER_SIZE) + disc)
+
+    write_file(os.path.join(work, "zso", "source.iso"), iso_image(rng, game_id(0), zso_mb * MB))
+
+    for number in range(icons):
+        text = ICON_SYS.format(title=f"Game {number}", publisher=rng.choice(PUBLISHERS)[:12])
+        write_file(os.path.join(work, "icons", f"{number}", "icon.sys"), encode_icon_sys(parse_icon_txt(text)))
+
+    lines = []
+    for number in range(list_lines):
+        disc_type = rng.choice(["DVD", "DVD", "CD", "POPS"])
+        lines.append(f"{game_title(rng)}|{game_id(number)}|{rng.choice(PUBLISHERS)}|{disc_type}|game{number}.iso\n")
+    write_file(os.path.join(work, "lists", "master.list"), "".join(lines).encode('utf-8'))
+    return corpus
+
+# Runs a helper script as __main__ and reports VmHWM on exit. wait4 would also count the RSS this
+# process had when it forked, VmHWM starts again from zero at exec.
+RUNNER = """
+import atexit, os, runpy, sys
+def report():
+    with open('/proc/self/status') as f, open(os.environ['BENCHMARK_RSS_FILE'], 'w') as out:
+        out.write(''.join(line.split()[1] for line in f if line.startswith('VmHWM:')))
+atexit.register(report)
+sys.argv = sys.argv[1:]
+sys.path[0] = os.path.dirname(os.path.abspath(sys.argv[0]))
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+def run(name, command, items=0, size=0, cwd=None):
+    # command is [python, script, args...], each helper runs in its own process
+    fd, rss_file = tempfile.mkstemp(prefix="psbbn-benchmark-rss-")
+    os.close(fd)
+    env = dict(os.environ, BENCHMARK_RSS_FILE=rss_file)
+    start = time.perf_counter()
+    process = subprocess.Popen([command[0], "-c", RUNNER] + command[1:], cwd=cwd, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    try:
+        with open(rss_file) as f:
+            peak_rss_kb = int(f.read())
+        os.remove(rss_file)
+    except (OSError, ValueError):
+        peak_rss_kb = usage.ru_maxrss
+    return {
+        "name": name,
+        "ok": process.returncode == 0,
+        "seconds": round(seconds, 4),
+        "items": items,
+        "items_per_s": round(items / seconds, 2) if items else None,
+        "mb": round(size / MB, 2),
+        "mb_per_s": round(size / MB / seconds, 2) if size else None,
+        "peak_rss_mb": round(peak_rss_kb / 1024, 1),
+    }
+
+def best(results):
+    # Keep the fastest of the repeats
+    return min(results, key=lambda result: result["seconds"])
+
+def folder_size(path):
+    return sum(os.path.getsize(os.path.join(dirpath, name)) for dirpath, _, names in os.walk(path) for name in names)
+
+def benchmarks(work, corpus):
+    python = sys.executable
+    games = os.path.join(work, "games")
+    zso_dir = os.path.join(work, "zso")
+    source_iso = os.path.join(zso_dir, "source.iso")
+    icon_files = [os.path.join(work, "icons", f"{number}", "icon.sys") for number in range(corpus["icons"])]
+    master_list = os.path.join(work, "lists", "master.list")
+    sorted_list = os.path.join(work, "lists", "sorted.list")
+
+    def list_builder(list_name, folders, items):
+        output = os.path.join(work, "lists", list_name)
+        size = sum(folder_size(os.path.join(games, folder)) for folder in folders)
+        return lambda: run(f"list-builder {list_name}", [python, os.path.join(HELPER_DIR, "list-builder.py"), games, output],
+                           items=items, size=size, cwd=TOOLKIT_PATH)
+
+    def list_sorter():
+        shutil.copyfile(master_list, sorted_list)
+        return run("list-sorter", [python, os.path.join(HELPER_DIR, "list-sorter.py"), sorted_list],
+                   items=corpus["list_lines"], size=os.path.getsize(master_list))
+
+    def icon_check():
+        return run("icon_sys_to_txt round trip", [python, os.path.join(HELPER_DIR, "icon_sys_to_txt.py"), "--check"] + icon_files,
+                   items=len(icon_files), size=sum(os.path.getsize(path) for path in icon_files))
+
+    def icon_convert():
+        # One process per file, as the installer converts icon.sys files
+        sample = icon_files[:50]
+        results = [run("icon_sys_to_txt", [python, os.path.join(HELPER_DIR, "icon_sys_to_txt.py"), path]) for path in sample]
+        seconds = sum(result["seconds"] for result in results)
+        return dict(results[0], seconds=round(seconds, 4), items=len(sample), items_per_s=round(len(sample) / seconds, 2),
+                    ok=all(result["ok"] for result in results), peak_rss_mb=max(result["peak_rss_mb"] for result in results))
+
+    steps = [
+        list_builder("ps2.list", ["CD", "DVD"], corpus["games"]),
+        list_builder("ps1.list", ["POPS"], corpus["vcds"]),
+        list_sorter,
+        icon_check,
+        icon_convert,
+    ]
+
+    for level, block_size in ZSO_SETTINGS:
+        zso = os.path.join(zso_dir, f"c{level}-b{block_size}.zso")
+        steps.append(lambda level=level, block_size=block_size, zso=zso: run(
+            f"ziso compress -c {level} -b {block_size}",
+            [python, os.path.join(HELPER_DIR, "ziso.py"), "-c", str(level), "-b", str(block_size), source_iso, zso],
+            size=os.path.getsize(source_iso)))
+        steps.append(lambda level=level, block_size=block_size, zso=zso: run(
+            f"ziso decompress c{level} b{block_size}",
+            [python, os.path.join(HELPER_DIR, "ziso.py"), "-c", "0", zso, os.path.join(zso_dir, "out.iso")],
+            size=os.path.getsize(source_iso)))
+
+    steps.append(lambda: run(
+        "ziso decompress dense",
+        [python, os.path.join(HELPER_DIR, "ziso.py"), "-d", "-c", "0", os.path.join(zso_dir, "c9-b2048.zso"),
+         os.path.join(zso_dir, "out.iso")],
+        size=os.path.getsize(source_iso)))
+    return steps
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r") as f:
+        baseline = {result["name"]: result for result in json.load(f)["results"]}
+    for result in results:
+        before = baseline.get(result["name"])
+        if before and before["seconds"]:
+            change = 100 * (result["seconds"] - before["seconds"]) / before["seconds"]
+            print(f"{result['name']:<40} {before['seconds']:>9.3f}s -> {result['seconds']:>9.3f}s ({change:+.1f}%)")
+
+def main(output=None, baseline=None, repeats=1, seed=0, work=None, keep=False, **sizes):
+    rng = random.Random(seed)
+    work = work or tempfile.mkdtemp(prefix="psbbn-benchmark-")
+    try:
+        print(f"Generating corpus in {work}...")
+        # Children inherit the peak RSS of this process at fork, so the corpus is built in a worker
+        with Pool(1) as pool:
+            corpus = pool.apply(generate_corpus, (work, rng), sizes)
+
+        results = []
+        for step in benchmarks(work, corpus):
+            result = best([step() for _ in range(repeats)])
+            results.append(result)
+            rate = result["items_per_s"] if result["items_per_s"] is not None else result["mb_per_s"]
+            unit = "items/s" if result["items_per_s"] is not None else "MB/s"
+            status = "" if result["ok"] else "  FAILED"
+            print(f"{result['name']:<40} {result['seconds']:>9.3f}s {rate:>10} {unit:<7} {result['peak_rss_mb']:>7} MB RSS{status}")
+    finally:
+        if not keep:
+            shutil.rmtree(work, ignore_errors=True)
+
+    report = {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "repeats": repeats,
+        "corpus": corpus,
+        "results": results,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+    if baseline:
+        compare(results, baseline)
+    return 1 if not all(result["ok"] for result in results) else 0
+
+def usage():
+    print("Usage: benchmark.py [options]")
+    print("  -o file      Write the results as JSON to file")
+    print("  -b file      Compare with the results of an earlier run")
+    print("  -r repeats   Run every benchmark this many times and keep the fastest (default 1)")
+    print("  -s seed      Seed of the generated corpus (default 0)")
+    print("  -w dir       Generate the corpus in dir instead of a temporary folder")
+    print("  -k           Keep the generated corpus")
+    print("  -n games     Number of PS2 ISO images (default %d)" % DEFAULT_GAMES)
+    print("  -p vcds      Number of PS1 VCD images (default %d)" % DEFAULT_VCDS)
+    print("  -i icons     Number of icon.sys files (default %d)" % DEFAULT_ICONS)
+    print("  -l lines     Number of lines in the game list (default %d)" % DEFAULT_LIST_LINES)
+    print("  -z MB        Size of the ISO used for the ziso benchmarks (default %d)" % DEFAULT_ZSO_MB)
+
+if __name__ == "__main__":
+    try:
+        optlist, args = gnu_getopt(sys.argv[1:], "o:b:r:s:w:kn:p:i:l:z:h")
+    except GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(1)
+
+    options = dict(optlist)
+    if "-h" in options or args:
+        usage()
+        sys.exit(0 if "-h" in options else 1)
+
+    sys.exit(main(
+        output=options.get("-o"),
+        baseline=options.get("-b"),
+        repeats=int(options.get("-r", 1)),
+        seed=int(options.get("-s", 0)),
+        work=options.get("-w"),
+        keep="-k" in options,
+        games=int(options.get("-n", DEFAULT_GAMES)),
+        iso_mb=DEFAULT_ISO_MB,
+        vcds=int(options.get("-p", DEFAULT_VCDS)),
+        vcd_mb=DEFAULT_VCD_MB,
+        icons=int(options.get("-i", DEFAULT_ICONS)),
+        list_lines=int(options.get("-l", DEFAULT_LIST_LINES)),
+        zso_mb=int(options.get("-z", DEFAULT_ZSO_MB)),
+    ))
@@ -0,0 +1,149 @@
+import sys
+import os
+import json
+import shlex
+import locale
+from contextlib import redirect_stdout
+from getopt import gnu_getopt, GetoptError
+
+from partition_metadata import read_games
+
+# Works out which SAS apps, ELF apps and games get a Game Channel partition before any asset is created,
+# with the same budget 03-Game-Installer.sh used to find out mid-run: 8 MB per partition, one partition
+# kept for the launcher, at most 799 items, SAS apps first, then ELF apps, then games in master.list order
+
+CAPACITY_MB = 129960
+PARTITION_MB = 8
+PP_CAP = 799
+MB = 1024 * 1024
+
+def partition_budget(available_mb, pp_cap=PP_CAP):
+    return max(0, min(available_mb // PARTITION_MB - 1, pp_cap))
+
+def scan_apps(apps_dir):
+    # An app needs an ELF and a title.cfg, the ones that come with an icon.sys are SAS apps.
+    # Apps are taken in the order of the bash glob this replaces, which collates by LC_COLLATE.
+    sas, elf = [], []
+    try:
+        names = sorted(os.listdir(apps_dir), key=locale.strxfrm)
+    except OSError:
+        return sas, elf
+    for name in names:
+        path = os.path.join(apps_dir, name)
+        if name.startswith(".") or not os.path.isdir(path):
+            continue
+        try:
+            files = os.listdir(path)
+        except OSError:
+            continue
+        has_elf = any(f.lower().endswith(".elf") and os.path.isfile(os.path.join(path, f)) for f in files)
+        if not has_elf or not os.path.isfile(os.path.join(path, "title.cfg")):
+            continue
+        (sas if os.path.isfile(os.path.join(path, "icon.sys")) else elf).append(name)
+    return sas, elf
+
+def game_size(game, game_roots):
+    # The image is looked up under <root>/<disc_type>/, the first root that has it wins
+    for root in game_roots:
+        try:
+            return os.path.getsize(os.path.join(root, game["disc_type"], game["file_name"]))
+        except OSError:
+            continue
+    return None
+
+def make_plan(available_mb, games, sas, elf, pp_cap=PP_CAP, game_roots=()):
+    pp_max = partition_budget(available_mb, pp_cap)
+    remaining = pp_max
+    sas_fit = sas[:remaining]
+    remaining -= len(sas_fit)
+    elf_fit = elf[:remaining]
+    remaining -= len(elf_fit)
+    games_fit = games[:remaining]
+
+    for game in games:
+        game["size"] = game_size(game, game_roots)
+    sizes = [game["size"] for game in games if game["size"] is not None]
+
+    return {
+        "available_mb": available_mb,
+        "pp_cap": pp_cap,
+        "pp_max": pp_max,
+        "sas": {"total": len(sas), "fit": sas_fit, "dropped": sas[len(sas_fit):]},
+        "elf": {"total": len(elf), "fit": elf_fit, "dropped": elf[len(elf_fit):]},
+        "games": {
+            "total": len(games),
+            "fit": len(games_fit),
+            "dropped": [game["title"] for game in games[len(games_fit):]],
+            "size_mb": (sum(sizes) + MB - 1) // MB,
+            "fit_size_mb": (sum(game["size"] or 0 for game in games_fit) + MB - 1) // MB,
+            "missing_images": [game["title"] for game in games if game["size"] is None],
+        },
+        "free_partitions": remaining - len(games_fit),
+    }
+
+def write_games(path, games):
+    with open(path, "w", encoding="utf-8") as f:
+        for game in games:
+            f.write("|".join(game[key] for key in ("title", "game_id", "publisher", "disc_type", "file_name")) + "\n")
+
+def shell_array(name, values):
+    return f"{name}=(" + " ".join(shlex.quote(value) for value in values) + ")"
+
+def usage():
+    print("Usage: capacity_planner.py [options] <apps_dir> [master.list]")
+    print("  -a mb        Free space on the drive in MB")
+    print("  -d device    Read the free space from the APA partition table of device instead")
+    print("  -c count     Most items the Game Channel can show (default %d)" % PP_CAP)
+    print("  -g dir       Folder with the CD, DVD and POPS game folders, can be given more than once")
+    print("  -o file      Write the games that get a partition to file, in master.list format")
+    print("  -r file      Write the plan as a JSON report to file")
+
+if __name__ == "__main__":
+    try:
+        optlist, args = gnu_getopt(sys.argv[1:], "a:d:c:g:o:r:h")
+    except GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(1)
+
+    try:
+        locale.setlocale(locale.LC_COLLATE, "")
+    except locale.Error:
+        pass
+
+    options = dict(optlist)
+    if "-h" in options or len(args) not in (1, 2) or ("-a" in options) == ("-d" in options):
+        usage()
+        sys.exit(0 if "-h" in options else 1)
+
+    if "-d" in options:
+        from apa_reader import Drive, APAError
+        try:
+            with Drive(options["-d"]) as drive:
+                available_mb = CAPACITY_MB - drive.used_mb()
+        except (OSError, APAError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+    else:
+        available_mb = int(options["-a"])
+
+    # stdout is eval'd by the installer, the label warnings of read_games go to stderr
+    with redirect_stdout(sys.stderr):
+        games = read_games(args[1]) if len(args) == 2 and os.path.isfile(args[1]) else []
+    sas, elf = scan_apps(args[0])
+    game_roots = [value for option, value in optlist if option == "-g"]
+    plan = make_plan(available_mb, games, sas, elf, int(options.get("-c", PP_CAP)), game_roots)
+
+    if "-o" in options:
+        write_games(options["-o"], games[:plan["games"]["fit"]])
+    if "-r" in options:
+        with open(options["-r"], "w") as f:
+            json.dump(plan, f, indent=2)
+
+    print(f"pp_max={plan['pp_max']}")
+    print(shell_array("SAS_APPS", plan["sas"]["fit"]))
+    print(f"sas_total={plan['sas']['total']}")
+    print(shell_array("ELF_APPS", plan["elf"]["fit"]))
+    print(f"elf_total={plan['elf']['total']}")
+    print(f"game_fit={plan['games']['fit']}")
+    print(f"game_total={plan['games']['total']}")
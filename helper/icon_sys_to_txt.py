@@ -3,26 +3,65 @@ import struct
 import unicodedata
 import os
 
+import instrument
+
+# Layout of a binary (PS2D) icon.sys
+ICON_SYS_SIZE = 0x3C4
+TITLE_OFFSET = 0xC0
+TITLE_LENGTH = 68
+ICON_NAME_OFFSET = 0x104
+ICON_NAME_LENGTH = 64
+
+# Defaults for a PS2X icon.sys, matching create_icon_sys in 03-Game-Installer.sh
+TXT_DEFAULTS = {
+    "title0": "",
+    "title1": "",
+    "bgcola": 0,
+    "bgcol0": (0, 0, 0),
+    "bgcol1": (0, 0, 0),
+    "bgcol2": (0, 0, 0),
+    "bgcol3": (0, 0, 0),
+    "lightdir0": (1.0, -1.0, 1.0),
+    "lightdir1": (-1.0, 1.0, -1.0),
+    "lightdir2": (0.0, 0.0, 0.0),
+    "lightcolamb": (64, 64, 64),
+    "lightcol0": (64, 64, 64),
+    "lightcol1": (16, 16, 16),
+    "lightcol2": (0, 0, 0),
+    "uninstallmes0": "",
+    "uninstallmes1": "",
+    "uninstallmes2": "",
+}
+
+# PS2D has no room for uninstall messages, they only exist in the PS2X text form
+TEXT_ONLY_KEYS = ("uninstallmes0", "uninstallmes1", "uninstallmes2")
+LIGHT_COLOUR_KEYS = ("lightcol0", "lightcol1", "lightcol2", "lightcolamb")
+DEFAULT_ICONS = ("list.ico", "list.ico", "del.ico")
+
 def read_rgb_rgba_block_raw(data, offset):
     # Return native 0–127 values without scaling for PSBBN
-    r = data[offset]
-    g = data[offset + 4]
-    b = data[offset + 8]
-    return (r, g, b)
+    return struct.unpack_from('<III', data, offset)
 
 def read_light_rgb_floats_raw(data, offset):
-    # Read float32 values and map directly to 0–127
-    return tuple(
-        max(0, min(127, round(struct.unpack('<f', data[offset + i*4 : offset + i*4 + 4])[0] * 127)))
-        for i in range(3)
-    )
+    # Keep the float32 values as stored, quantisation only happens when writing text
+    return struct.unpack_from('<fff', data, offset)
 
 def read_light_direction(data, offset):
-    return struct.unpack('<fff', data[offset:offset+12])
+    return struct.unpack_from('<fff', data, offset)
+
+def light_to_txt(values):
+    # Map float32 light colours directly to 0–127
+    return tuple(max(0, min(127, round(v * 127))) for v in values)
 
-def decode_title_pair(data, title_offset=0xC0, length=68):
-    split_offset = struct.unpack("<H", data[0x06:0x08])[0]
-    title_block = data[title_offset:title_offset + length]
+def light_from_txt(values):
+    return tuple(v / 127 for v in values)
+
+def read_icon_name(data, offset):
+    return bytes(data[offset:offset + ICON_NAME_LENGTH]).split(b'\x00')[0].decode('ascii', errors='ignore')
+
+def decode_title_pair(data, base=0, length=TITLE_LENGTH):
+    split_offset = struct.unpack_from("<H", data, base + 0x06)[0]
+    title_block = bytes(data[base + TITLE_OFFSET:base + TITLE_OFFSET + length])
     title0_bytes = title_block[:split_offset]
     title1_bytes = title_block[split_offset:]
     try:
@@ -37,34 +76,122 @@ def decode_title_pair(data, title_offset=0xC0, length=68):
         title1 = ""
     return title0, title1
 
-def parse_icon_sys(filepath):
-    with open(filepath, "rb") as f:
-        data = f.read()
-    if data[:4] != b"PS2D":
+def transliterate(c):
+    # Characters Shift-JIS has no code for lose their accents (é -> e), anything else becomes ?
+    try:
+        return c.encode('shift_jis')
+    except UnicodeEncodeError:
+        pass
+    encoded = b""
+    for b in unicodedata.normalize('NFKD', c):
+        if unicodedata.combining(b):
+            continue
+        try:
+            encoded += b.encode('shift_jis')
+        except UnicodeEncodeError:
+            encoded += b"?"
+    return encoded or b"?"
+
+def transliterate_text(text):
+    return ''.join(transliterate(c).decode('shift_jis') for c in text)
+
+def full_width_char(c):
+    wide = chr(0x3000) if c == ' ' else chr(ord(c) + 0xFEE0)
+    try:
+        return wide.encode('shift_jis')
+    except UnicodeEncodeError:
+        return c.encode('shift_jis')
+
+def encode_title(text, full_width=True):
+    # Titles are conventionally stored as full-width Shift-JIS, ASCII stays half-width when full_width is off
+    encoded = b""
+    for c in transliterate_text(text):
+        encoded += full_width_char(c) if full_width and ' ' <= c <= '~' else c.encode('shift_jis')
+    return encoded
+
+def encode_titles(title0, title1):
+    # Full-width when both titles fit, half-width otherwise, cut down from the end of title1 then title0 as a last resort
+    limit = TITLE_LENGTH - 1
+    for full_width in (True, False):
+        encoded0, encoded1 = encode_title(title0, full_width), encode_title(title1, full_width)
+        if len(encoded0) + len(encoded1) <= limit:
+            return encoded0, encoded1
+    while len(encoded0) + len(encoded1) > limit and title1:
+        title1 = title1[:-1]
+        encoded1 = encode_title(title1, False)
+    while len(encoded0) > limit:
+        title0 = title0[:-1]
+        encoded0 = encode_title(title0, False)
+    return encoded0, encoded1
+
+def parse_icon_sys_buffer(data, offset=0):
+    # Decode an icon.sys stored anywhere in a buffer (bytes, mmap or memoryview) without copying the buffer
+    view = memoryview(data)
+    if len(view) - offset < ICON_NAME_OFFSET + 3 * ICON_NAME_LENGTH:
+        raise ValueError("This is not a valid icon.sys file (file is truncated).")
+    if view[offset:offset + 4] != b"PS2D":
         raise ValueError("This is not a valid icon.sys file (missing PS2D header).")
-    title0, title1 = decode_title_pair(data)
+    title0, title1 = decode_title_pair(view, offset)
     parsed = {
         "title0": title0,
         "title1": title1,
-        "bgcola": data[0x0C],
-        "bgcol0": read_rgb_rgba_block_raw(data, 0x10),
-        "bgcol1": read_rgb_rgba_block_raw(data, 0x20),
-        "bgcol2": read_rgb_rgba_block_raw(data, 0x30),
-        "bgcol3": read_rgb_rgba_block_raw(data, 0x40),
-        "lightdir0": read_light_direction(data, 0x50),
-        "lightdir1": read_light_direction(data, 0x60),
-        "lightdir2": read_light_direction(data, 0x70),
-        "lightcol0": read_light_rgb_floats_raw(data, 0x80),
-        "lightcol1": read_light_rgb_floats_raw(data, 0x90),
-        "lightcol2": read_light_rgb_floats_raw(data, 0xA0),
-        "lightcolamb": read_light_rgb_floats_raw(data, 0xB0),
+        "bgcola": struct.unpack_from('<I', view, offset + 0x0C)[0],
+        "bgcol0": read_rgb_rgba_block_raw(view, offset + 0x10),
+        "bgcol1": read_rgb_rgba_block_raw(view, offset + 0x20),
+        "bgcol2": read_rgb_rgba_block_raw(view, offset + 0x30),
+        "bgcol3": read_rgb_rgba_block_raw(view, offset + 0x40),
+        "lightdir0": read_light_direction(view, offset + 0x50),
+        "lightdir1": read_light_direction(view, offset + 0x60),
+        "lightdir2": read_light_direction(view, offset + 0x70),
+        "lightcol0": read_light_rgb_floats_raw(view, offset + 0x80),
+        "lightcol1": read_light_rgb_floats_raw(view, offset + 0x90),
+        "lightcol2": read_light_rgb_floats_raw(view, offset + 0xA0),
+        "lightcolamb": read_light_rgb_floats_raw(view, offset + 0xB0),
+        "icons": tuple(read_icon_name(view, offset + ICON_NAME_OFFSET + i * ICON_NAME_LENGTH) for i in range(3)),
         "uninstallmes0": "",
         "uninstallmes1": "",
         "uninstallmes2": ""
     }
     return parsed
 
-def write_icon_txt(parsed, output_path):
+def parse_icon_sys(filepath):
+    with open(filepath, "rb") as f:
+        data = f.read()
+    return parse_icon_sys_buffer(data)
+
+def iter_psu_icon_sys(data):
+    # Yield (offset, parsed) for each icon.sys in a .psu save archive: 512-byte entry headers, file data padded to 1 KB
+    view = memoryview(data)
+    pos = 0
+    while pos + 0x200 <= len(view):
+        mode, size = struct.unpack_from('<H2xI', view, pos)
+        name = bytes(view[pos + 0x40:pos + 0x60]).split(b'\x00')[0]
+        pos += 0x200
+        if mode & 0x20:
+            continue  # Directory entries have no data
+        if name.lower() == b"icon.sys":
+            yield pos, parse_icon_sys_buffer(view, pos)
+        pos += (size + 0x3FF) & ~0x3FF
+
+def encode_icon_sys(parsed):
+    title0, title1 = encode_titles(parsed["title0"], parsed["title1"])
+
+    data = bytearray(ICON_SYS_SIZE)
+    struct.pack_into('<4sHHII', data, 0, b"PS2D", 0, len(title0), 0, parsed["bgcola"])
+    for i in range(4):
+        struct.pack_into('<III', data, 0x10 + i * 0x10, *parsed[f"bgcol{i}"])
+    for i in range(3):
+        struct.pack_into('<fff', data, 0x50 + i * 0x10, *parsed[f"lightdir{i}"])
+    for i, key in enumerate(LIGHT_COLOUR_KEYS):
+        struct.pack_into('<fff', data, 0x80 + i * 0x10, *parsed[key])
+    data[TITLE_OFFSET:TITLE_OFFSET + len(title0) + len(title1)] = title0 + title1
+    for i, name in enumerate(parsed.get("icons", DEFAULT_ICONS)):
+        name = name.encode('ascii')[:ICON_NAME_LENGTH - 1]
+        start = ICON_NAME_OFFSET + i * ICON_NAME_LENGTH
+        data[start:start + len(name)] = name
+    return bytes(data)
+
+def format_icon_txt(parsed):
     lines = [
         "PS2X",
         f"title0={parsed['title0']}",
@@ -77,26 +204,123 @@ def write_icon_txt(parsed, output_path):
         f"lightdir0={','.join(f'{v:.4f}' for v in parsed['lightdir0'])}",
         f"lightdir1={','.join(f'{v:.4f}' for v in parsed['lightdir1'])}",
         f"lightdir2={','.join(f'{v:.4f}' for v in parsed['lightdir2'])}",
-        f"lightcolamb={','.join(map(str, parsed['lightcolamb']))}",
-        f"lightcol0={','.join(map(str, parsed['lightcol0']))}",
-        f"lightcol1={','.join(map(str, parsed['lightcol1']))}",
-        f"lightcol2={','.join(map(str, parsed['lightcol2']))}",
+        f"lightcolamb={','.join(map(str, light_to_txt(parsed['lightcolamb'])))}",
+        f"lightcol0={','.join(map(str, light_to_txt(parsed['lightcol0'])))}",
+        f"lightcol1={','.join(map(str, light_to_txt(parsed['lightcol1'])))}",
+        f"lightcol2={','.join(map(str, light_to_txt(parsed['lightcol2'])))}",
         f"uninstallmes0={parsed['uninstallmes0']}",
         f"uninstallmes1={parsed['uninstallmes1']}",
         f"uninstallmes2={parsed['uninstallmes2']}"
     ]
+    return "\n".join(lines)
+
+def parse_icon_txt(text):
+    lines = text.splitlines()
+    if not lines or lines[0].strip() != "PS2X":
+        raise ValueError("This is not a valid icon.txt file (missing PS2X header).")
+    values = dict(TXT_DEFAULTS)
+    for line in lines[1:]:
+        key, sep, value = line.partition('=')
+        key = key.strip()
+        if not sep or key not in TXT_DEFAULTS:
+            continue
+        if key.startswith(("title", "uninstallmes")):
+            values[key] = value.strip()
+        elif key == "bgcola":
+            values[key] = int(value)
+        elif key.startswith("lightdir"):
+            values[key] = tuple(float(v) for v in value.split(','))
+        else:
+            values[key] = tuple(int(v) for v in value.split(','))
+    for key in LIGHT_COLOUR_KEYS:
+        values[key] = light_from_txt(values[key])
+    values["icons"] = DEFAULT_ICONS
+    return values
+
+def write_icon_txt(parsed, output_path):
     with open(output_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+        f.write(format_icon_txt(parsed))
     print(f"[✓] icon.txt successfully written to: {output_path}")
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python icon_sys_to_txt.py path/to/icon.sys")
+def write_icon_sys(parsed, output_path):
+    with open(output_path, "wb") as f:
+        f.write(encode_icon_sys(parsed))
+    print(f"[✓] icon.sys successfully written to: {output_path}")
+
+def check_round_trip(data):
+    # Return a list of fields that do not survive binary -> text -> binary
+    parsed = parse_icon_sys_buffer(data)
+    errors = []
+    reparsed = parse_icon_sys_buffer(encode_icon_sys(parsed))
+    errors += [f"binary:{key}" for key in parsed if parsed[key] != reparsed[key]]
+    text = format_icon_txt(parsed)
+    if format_icon_txt(parse_icon_txt(text)) != text:
+        errors.append("text")
+    errors += check_text_round_trip(text)
+    return errors
+
+def check_text_round_trip(text):
+    # Return a list of fields that change in text -> binary -> text, like transliterated or shortened titles
+    # and uninstall messages, which PS2D has no room for
+    parsed = parse_icon_txt(text)
+    reparsed = parse_icon_sys_buffer(encode_icon_sys(parsed))
+    before = dict(line.partition('=')[::2] for line in format_icon_txt(parsed).splitlines()[1:])
+    after = dict(line.partition('=')[::2] for line in format_icon_txt(reparsed).splitlines()[1:])
+    return [f"text:{key}" for key in before if before[key] != after[key]]
+
+def usage():
+    print("Usage: python icon_sys_to_txt.py path/to/icon.sys")
+    print("       python icon_sys_to_txt.py --encode path/to/icon.txt [path/to/icon.sys]")
+    print("       python icon_sys_to_txt.py --check path/to/icon.sys|icon.txt|save.psu ...")
+
+def main():
+    if len(sys.argv) >= 3 and sys.argv[1] == "--encode":
+        txt_path = sys.argv[2]
+        out_path = sys.argv[3] if len(sys.argv) > 3 else os.path.join(os.path.dirname(txt_path), "icon.sys")
+        try:
+            with open(txt_path, "r", encoding="utf-8") as f:
+                write_icon_sys(parse_icon_txt(f.read()), out_path)
+        except Exception as e:
+            print(f"[!] Failed to encode icon.txt: {e}")
+            sys.exit(1)
+    elif len(sys.argv) >= 3 and sys.argv[1] == "--check":
+        failed = 0
+        for path in sys.argv[2:]:
+            with open(path, "rb") as f:
+                data = f.read()
+            try:
+                if data.startswith(b"PS2X"):
+                    offsets = [None]
+                elif path.lower().endswith(".psu"):
+                    offsets = [offset for offset, _ in iter_psu_icon_sys(data)]
+                else:
+                    offsets = [0]
+                for offset in offsets:
+                    if offset is None:
+                        errors = check_text_round_trip(data.decode("utf-8"))
+                    else:
+                        errors = check_round_trip(memoryview(data)[offset:])
+                    if errors:
+                        failed += 1
+                        where = path if offset is None else f"{path}@{offset:#x}"
+                        print(f"[!] {where}: round trip changed {', '.join(errors)}")
+            except ValueError as e:
+                failed += 1
+                print(f"[!] {path}: {e}")
+        print(f"Checked {len(sys.argv) - 2} file(s), {failed} failure(s).")
+        sys.exit(1 if failed else 0)
+    elif len(sys.argv) == 2:
+        icon_sys_path = sys.argv[1]
+        out_path = os.path.join(os.path.dirname(icon_sys_path), "icon.txt")
+        try:
+            parsed_data = parse_icon_sys(icon_sys_path)
+            write_icon_txt(parsed_data, out_path)
+        except Exception as e:
+            print(f"[!] Failed to parse icon.sys: {e}")
+    else:
+        usage()
         sys.exit(1)
-    icon_sys_path = sys.argv[1]
-    out_path = os.path.join(os.path.dirname(icon_sys_path), "icon.txt")
-    try:
-        parsed_data = parse_icon_sys(icon_sys_path)
-        write_icon_txt(parsed_data, out_path)
-    except Exception as e:
-        print(f"[!] Failed to parse icon.sys: {e}")
+
+if __name__ == "__main__":
+    # Set PSBBN_PROFILE to profile a run, see instrument.py
+    instrument.run(main)
@@ -0,0 +1,104 @@
+import sys
+import os
+import io
+import time
+from contextlib import contextmanager
+
+# Opt-in profiling for the helpers, without editing code:
+#   PSBBN_PROFILE=all                       cProfile, tracemalloc and stage timers
+#   PSBBN_PROFILE=cprofile,memory,timers    any combination of them
+# Reports go next to LOG_FILE when it is set, else to PSBBN_PROFILE_DIR or the current directory.
+
+OPTIONS = ("cprofile", "memory", "timers")
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 15
+
+def enabled_options():
+    value = os.environ.get("PSBBN_PROFILE", "").strip().lower()
+    if not value or value in ("0", "no", "off"):
+        return set()
+    if value in ("1", "yes", "on", "all"):
+        return set(OPTIONS)
+    return {option.strip() for option in value.split(",")} & set(OPTIONS)
+
+enabled = enabled_options()
+timers = {}
+
+@contextmanager
+def stage(name):
+    # Named stage timer, adds up when the same stage runs more than once
+    if "timers" not in enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        total, count = timers.get(name, (0.0, 0))
+        timers[name] = (total + time.perf_counter() - start, count + 1)
+
+def report_dir():
+    log_file = os.environ.get("LOG_FILE")
+    if log_file:
+        return os.path.dirname(os.path.abspath(log_file))
+    return os.environ.get("PSBBN_PROFILE_DIR", os.getcwd())
+
+def report_base(name):
+    return os.path.join(report_dir(), f"profile-{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+
+def write_report(base, name, seconds, profiler, snapshot, peak):
+    lines = [f"{name}: {' '.join(sys.argv[1:])}", f"Total {seconds:.3f}s", ""]
+
+    if timers:
+        lines.append("Stages:")
+        for stage_name, (total, count) in timers.items():
+            lines.append(f"  {stage_name:<30} {total:>10.3f}s  x{count}")
+        lines.append("")
+
+    if snapshot is not None:
+        lines.append(f"Peak traced memory: {peak / (1024 * 1024):.1f} MB")
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            lines.append(f"  {stat}")
+        lines.append("")
+
+    if profiler is not None:
+        import pstats
+        profiler.dump_stats(base + ".prof")
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        lines.append(stream.getvalue())
+
+    with open(base + ".txt", "w") as f:
+        f.write("\n".join(lines))
+
+def run(main, *args, **kwargs):
+    # Runs main with the requested instrumentation, the report is also written when main calls sys.exit
+    if not enabled:
+        return main(*args, **kwargs)
+
+    name = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+    profiler = snapshot = None
+    peak = 0
+    if "memory" in enabled:
+        import tracemalloc
+        tracemalloc.start()
+    if "cprofile" in enabled:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    start = time.perf_counter()
+    try:
+        return main(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+        if "memory" in enabled:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        try:
+            write_report(report_base(name), name, seconds, profiler, snapshot, peak)
+        except OSError as e:
+            print(f"Warning: failed to write the profiling report: {e}", file=sys.stderr)
@@ -5,6 +5,8 @@ import math
 import re
 import shlex
 
+import instrument
+
 done = "Error: No games found."
 total = 0
 count = 0
@@ -241,12 +243,13 @@ def main(arg1, arg2):
             os.remove(games_list_path)
 
         # Count files
-        for folder, extensions in folders_to_scan:
-            if os.path.isdir(game_path + folder):
-                count_files(folder, extensions)
-            else:
-                print(f'{folder} not found at ' + game_path)
-                sys.exit(1)
+        with instrument.stage("count files"):
+            for folder, extensions in folders_to_scan:
+                if os.path.isdir(game_path + folder):
+                    count_files(folder, extensions)
+                else:
+                    print(f'{folder} not found at ' + game_path)
+                    sys.exit(1)
 
         if total == 0:
             if games_list_path.endswith("ps2.list"):
@@ -258,12 +261,13 @@ def main(arg1, arg2):
         # Process files
         for folder, extensions in folders_to_scan:
             if os.path.isdir(game_path + folder):
-                process_files(folder, extensions)
+                with instrument.stage(f"process {folder}"):
+                    process_files(folder, extensions)
 
         print(done)
 
 if __name__ == "__main__":
     if len(sys.argv) == 3:
-        main(sys.argv[1], sys.argv[2])
+        instrument.run(main, sys.argv[1], sys.argv[2])
     else:
         print("Usage: build-list.py <game_path> <output_list_path>")
@@ -3,6 +3,8 @@ import unicodedata
 import re
 from natsort import natsorted
 
+import instrument
+
 # Function to normalize text by removing diacritical marks and converting to ASCII
 def normalize_text(text):
     return ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
@@ -184,7 +186,8 @@ def sort_games_list(games_list_path):
 
 
     # Sort and write the list back
-    sorted_lines = natsorted(lines, key=sort_key)
+    with instrument.stage("sort"):
+        sorted_lines = natsorted(lines, key=sort_key)
     with open(games_list_path, 'w') as file:
         file.writelines(sorted_lines)
 
@@ -192,4 +195,4 @@ if __name__ == "__main__":
     if len(sys.argv) != 2:
         print("Usage: sort-list-ps2.py <path_to_ps2.list>")
         sys.exit(1)
-    sort_games_list(sys.argv[1])
+    instrument.run(sort_games_list, sys.argv[1])
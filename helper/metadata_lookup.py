@@ -0,0 +1,169 @@
+import sys
+import os
+import io
+import socket
+import threading
+import socketserver
+from getopt import gnu_getopt, GetoptError
+
+# Answers metadata queries from one process instead of an awk/grep scan of the CSVs for every game or app.
+# A query is one line of tab separated fields, the answer is one line, empty when nothing matches:
+#   title <ps1|ps2> <game_id>     title|publisher from TitlesDB
+#   art <game_id>                 PSBBN art database slug from ArtDB
+#   app <name>                    app title from AppDB, for the first entry name starts with
+#   game <list> <game_id>         line of a games list (master.list, ps1.list, ...) for game_id
+#   file <list> <file_name>       line of a games list for file_name
+# Databases are loaded on their first query, lists again whenever they change on disk.
+
+HELPER_DIR = os.path.dirname(os.path.abspath(__file__))
+TITLES_DB = {"ps1": "TitlesDB_PS1_English.csv", "ps2": "TitlesDB_PS2_English.csv"}
+ART_DB = "ArtDB.csv"
+APP_DB = "AppDB.csv"
+
+def read_rows(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            yield line.rstrip("\r\n").split("|")
+
+class MetadataDB:
+    def __init__(self, db_dir=HELPER_DIR):
+        self.db_dir = db_dir
+        self.tables = {}
+        self.lists = {}
+        self.lock = threading.Lock()
+
+    def table(self, name, load):
+        with self.lock:
+            if name not in self.tables:
+                self.tables[name] = load(os.path.join(self.db_dir, name))
+            return self.tables[name]
+
+    def games_list(self, path):
+        # Keyed on the file itself, so a list rewritten during the install is read again
+        st = os.stat(path)
+        stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self.lock:
+            cached = self.lists.get(path)
+            if cached is None or cached[0] != stamp:
+                by_id, by_file = {}, {}
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    for line in f:
+                        line = line.rstrip("\n")
+                        fields = line.split("|")
+                        if len(fields) < 5:
+                            continue
+                        by_id.setdefault(fields[1], line)
+                        by_file.setdefault(fields[4], line)
+                cached = self.lists[path] = (stamp, by_id, by_file)
+            return cached
+
+    def title(self, platform, game_id):
+        def load(path):
+            return {row[0]: "|".join(row[1:3]) for row in read_rows(path) if len(row) == 3}
+        return self.table(TITLES_DB[platform], load).get(game_id)
+
+    def art(self, game_id):
+        def load(path):
+            return {row[0]: row[1] for row in read_rows(path) if len(row) >= 2}
+        return self.table(ART_DB, load).get(game_id)
+
+    def app(self, name):
+        # Same match as the awk it replaces, the first row whose non-empty key is a prefix of name
+        def load(path):
+            prefixes = {}
+            for index, row in enumerate(read_rows(path)):
+                if len(row) >= 2 and row[0]:
+                    prefixes.setdefault(row[0], (index, row[1]))
+            return prefixes
+        prefixes = self.table(APP_DB, load)
+        matches = [prefixes[name[:length]] for length in range(1, len(name) + 1) if name[:length] in prefixes]
+        return min(matches)[1] if matches else None
+
+    def game(self, path, game_id):
+        return self.games_list(path)[1].get(game_id)
+
+    def file(self, path, file_name):
+        return self.games_list(path)[2].get(file_name)
+
+    def answer(self, query):
+        kind, *args = query.rstrip("\r\n").split("\t")
+        lookup = {"title": self.title, "art": self.art, "app": self.app, "game": self.game, "file": self.file}.get(kind)
+        if lookup is None:
+            print(f"Error: unknown query {kind!r}", file=sys.stderr)
+            return ""
+        try:
+            value = lookup(*args)
+        except (TypeError, KeyError) as e:
+            print(f"Error: bad query {query.strip()!r}: {e}", file=sys.stderr)
+            return ""
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return ""
+        return value or ""
+
+def serve_stream(db, fin, fout):
+    # One answer per query, flushed straight away so a bash coproc can read it back
+    for query in fin:
+        if query.strip():
+            fout.write(db.answer(query) + "\n")
+            fout.flush()
+
+def serve_socket(db, path):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            serve_stream(db, io.TextIOWrapper(self.rfile, encoding="utf-8", errors="replace"),
+                         io.TextIOWrapper(self.wfile, encoding="utf-8"))
+
+    if os.path.exists(path):
+        os.remove(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(path)
+
+def query_socket(path, fin, fout):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        reader = sock.makefile("r", encoding="utf-8", errors="replace")
+        for query in fin:
+            if query.strip():
+                sock.sendall(query.rstrip("\n").encode("utf-8") + b"\n")
+                fout.write(reader.readline())
+                fout.flush()
+
+def usage():
+    print("Usage: metadata_lookup.py [options]")
+    print("  Reads queries from stdin and writes one answer per line to stdout.")
+    print("  -D dir       Folder with TitlesDB, ArtDB and AppDB (default %s)" % HELPER_DIR)
+    print("  -s socket    Answer queries on a Unix socket until interrupted")
+    print("  -c socket    Send the queries on stdin to a running -s process")
+
+if __name__ == "__main__":
+    try:
+        optlist, args = gnu_getopt(sys.argv[1:], "D:s:c:h")
+    except GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(1)
+
+    options = dict(optlist)
+    if "-h" in options or args:
+        usage()
+        sys.exit(0 if "-h" in options else 1)
+
+    if "-c" in options:
+        try:
+            query_socket(options["-c"], sys.stdin, sys.stdout)
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+
+    db = MetadataDB(options.get("-D", HELPER_DIR))
+    if "-s" in options:
+        serve_socket(db, options["-s"])
+    else:
+        serve_stream(db, sys.stdin, sys.stdout)
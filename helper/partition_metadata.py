@@ -0,0 +1,212 @@
+import sys
+import os
+import re
+import shutil
+import unicodedata
+from getopt import gnu_getopt, GetoptError
+
+# Reads master.list once and writes the partition label, info.sys, icon.sys, artwork, icon and
+# BBNL cfg of every game, replacing the per-game PP_NAME and heredocs of 03-Game-Installer.sh
+
+LABEL_LENGTH = 32
+ICON_TITLE_LENGTH = 48
+
+INFO_SYS = """title = {title}
+title_id = {title_id}
+title_sub_id = 0
+release_date = 
+developer_id = 
+publisher_id = {publisher}
+note = 
+content_web = 
+image_topviewflag = 0
+image_type = 0
+image_count = 1
+image_viewsec = 600
+copyright_viewflag = 0
+copyright_imgcount = 0
+genre = 
+parental_lock = 1
+effective_date = 0
+expire_date = 0
+violence_flag = 0
+content_type = {content_type}
+content_subtype = 0
+"""
+
+ICON_SYS = """PS2X
+title0={title}
+title1={publisher}
+bgcola=0
+bgcol0=0,0,0
+bgcol1=0,0,0
+bgcol2=0,0,0
+bgcol3=0,0,0
+lightdir0=1.0,-1.0,1.0
+lightdir1=-1.0,1.0,-1.0
+lightdir2=0.0,0.0,0.0
+lightcolamb=64,64,64
+lightcol0=64,64,64
+lightcol1=16,16,16
+lightcol2=0,0,0
+uninstallmes0=
+uninstallmes1=
+uninstallmes2=
+"""
+
+BBNL_CFG = """file_name={file_name}
+title_id={game_id}
+disc_type={disc_type}
+launcher={launcher}
+"""
+
+# iconv ASCII//TRANSLIT spellings for letters and signs NFKD cannot split into ASCII
+TRANSLIT = {
+    "ß": "ss", "Æ": "AE", "æ": "ae", "Œ": "OE", "œ": "oe", "Ø": "O", "ø": "o", "Þ": "TH", "þ": "th",
+    "Ð": "D", "ð": "d", "Đ": "D", "đ": "d", "Ł": "L", "ł": "l", "ı": "i", "×": "x", "•": "o",
+    "½": " 1/2 ", "¼": " 1/4 ", "¾": " 3/4 ", "™": "(TM)", "©": "(C)", "®": "(R)",
+}
+DUPLICATE_SUFFIX = "_D{}"
+
+DEFAULT_ART = {"POPS": "ps1.png"}
+DEFAULT_ICONS = {"DVD": "dvd.ico", "CD": "cd.ico", "POPS": "ps1.ico"}
+
+def title_id(game_id):
+    # SLUS_123.45 -> SLUS-12345
+    return re.sub(r'_(...)\.', r'-\1', game_id, count=1).replace('.', '', 1)
+
+def partition_label(game_id, title, suffix=""):
+    # Keep only A-Z, 0-9 and single underscores, transliterating like iconv //TRANSLIT, with room kept for suffix
+    title = title.replace('²', '2').replace('³', '3')
+    title = ''.join(TRANSLIT.get(c, c) for c in title)
+    title = ''.join(c for c in unicodedata.normalize('NFKD', title) if not unicodedata.combining(c))
+    title = title.encode('ascii', errors='replace').decode('ascii').upper()
+    title = re.sub(r'[^A-Z0-9]', '_', title)
+    title = re.sub(r'_$', '', re.sub(r'^_', '', title))
+    title = re.sub(r'__*', '_', title)
+    return re.sub(r'_$', '', f"PP.{title_id(game_id)}.{title}"[:LABEL_LENGTH - len(suffix)]) + suffix
+
+def assign_labels(games):
+    # Two games with the same label would fail to get a partition, the later ones get a _D2, _D3... disc marker,
+    # which cannot be mistaken for the sequel number at the end of a title
+    seen = set()
+    for game in games:
+        label = partition_label(game["game_id"], game["title"])
+        if label in seen:
+            number = 2
+            while True:
+                candidate = partition_label(game["game_id"], game["title"], DUPLICATE_SUFFIX.format(number))
+                if candidate not in seen:
+                    break
+                number += 1
+            print(f"Warning: {game['title']} has the same partition label as another game, using {candidate}")
+            label = candidate
+        seen.add(label)
+        game["label"] = label
+    return games
+
+def read_games(games_list_path):
+    games = []
+    with open(games_list_path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("|")
+            if len(fields) < 5:
+                continue
+            title, game_id, publisher, disc_type, file_name = fields[:5]
+            games.append({
+                "title": title,
+                "game_id": game_id,
+                "publisher": publisher,
+                "disc_type": disc_type,
+                "file_name": file_name,
+            })
+    return assign_labels(games)
+
+def write_text(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+def icon_title(title):
+    return title[:45] + "..." if len(title) > ICON_TITLE_LENGTH else title
+
+def write_game(game, icons_dir, assets_dir, art_dir, launcher, missing_art, missing_icon):
+    game_dir = os.path.join(icons_dir, game["game_id"])
+    os.makedirs(game_dir, exist_ok=True)
+
+    for name in ("boot.kelf", "system.cnf"):
+        shutil.copyfile(os.path.join(assets_dir, "BBNL", name), os.path.join(game_dir, name))
+
+    write_text(os.path.join(game_dir, "info.sys"), INFO_SYS.format(
+        title=game["title"], title_id=title_id(game["game_id"]), publisher=game["publisher"], content_type=255))
+    write_text(os.path.join(game_dir, "icon.sys"), ICON_SYS.format(
+        title=icon_title(game["title"]), publisher=game["publisher"]))
+
+    art = os.path.join(art_dir, f"{game['game_id']}.png")
+    if not (os.path.isfile(art) and os.path.getsize(art) > 0):
+        missing_art.append(game)
+        art = os.path.join(art_dir, DEFAULT_ART.get(game["disc_type"], "ps2.png"))
+    shutil.copyfile(art, os.path.join(game_dir, "jkt_001.png"))
+
+    icon = os.path.join(icons_dir, "ico", f"{game['game_id']}.ico")
+    if not os.path.isfile(icon):
+        missing_icon.append(game)
+        icon = os.path.join(icons_dir, "ico", DEFAULT_ICONS.get(game["disc_type"], "dvd.ico"))
+    shutil.copyfile(icon, os.path.join(game_dir, "list.ico"))
+
+    launcher_value = "POPS" if game["disc_type"] == "POPS" else launcher
+    write_text(os.path.join(icons_dir, "bbnl", f"{game['label'][3:]}.cfg"), BBNL_CFG.format(
+        file_name=game["file_name"], game_id=game["game_id"], disc_type=game["disc_type"], launcher=launcher_value))
+    return game_dir
+
+def main(games_list_path, icons_dir, assets_dir, launcher, manifest_path=None, missing_art_path=None, missing_icon_path=None):
+    games = read_games(games_list_path)
+    art_dir = os.path.join(icons_dir, "art")
+    os.makedirs(os.path.join(icons_dir, "bbnl"), exist_ok=True)
+    missing_art, missing_icon = [], []
+    failed = 0
+    manifest = []
+
+    for game in games:
+        try:
+            game_dir = write_game(game, icons_dir, assets_dir, art_dir, launcher, missing_art, missing_icon)
+        except OSError as e:
+            failed += 1
+            print(f"Error: Failed to create assets for {game['title']}: {e}")
+            continue
+        manifest.append(f"{game['label']}|{game['game_id']}|{game['disc_type']}|{game_dir}")
+        print(f"Created assets for {game['title']} ({game['label']})")
+
+    for path, games_missing in ((missing_art_path, missing_art), (missing_icon_path, missing_icon)):
+        if path and games_missing:
+            with open(path, "a") as f:
+                for game in games_missing:
+                    f.write(f"{game['game_id']} {game['title']}\n")
+    if manifest_path:
+        write_text(manifest_path, "".join(line + "\n" for line in manifest))
+
+    print(f"Created assets for {len(manifest)} of {len(games)} games, "
+          f"{len(missing_art)} without artwork, {len(missing_icon)} without an HDD-OSD icon.")
+    return failed
+
+def usage():
+    print("Usage: partition_metadata.py [options] <master.list> <icons_dir> <assets_dir> <launcher>")
+    print("  -m file      Write label|game_id|disc_type|game_dir for every game to file")
+    print("  -a file      Append games without artwork to file")
+    print("  -i file      Append games without an HDD-OSD icon to file")
+
+if __name__ == "__main__":
+    try:
+        optlist, args = gnu_getopt(sys.argv[1:], "m:a:i:h")
+    except GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(1)
+
+    options = dict(optlist)
+    if "-h" in options or len(args) != 4:
+        usage()
+        sys.exit(0 if "-h" in options else 1)
+
+    failed = main(*args, manifest_path=options.get("-m"),
+                  missing_art_path=options.get("-a"), missing_icon_path=options.get("-i"))
+    sys.exit(1 if failed else 0)
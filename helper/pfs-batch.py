@@ -0,0 +1,172 @@
+import sys
+import os
+import re
+import struct
+import subprocess
+from getopt import gnu_getopt, GetoptError
+
+from apa_reader import Drive, APAError
+from partition_metadata import read_games
+
+# Creates the BBNL partitions for every game in master.list with a single PFS Shell session
+
+PARTITION_SIZE_MB = 8
+POPSTARTER_FILES = ["1.png", "2.png", "bg.png", "man.xml"]
+# "> " before a device is selected, "# " without a mounted partition, "PP.LABEL:/res# " with one
+PROMPT = re.compile(r'^> |(?:\S+:/\S*)?# ', re.M)
+
+def partition_commands(game, icons_dir, assets_dir):
+    commands = [
+        f"mkpart {game['label']} {PARTITION_SIZE_MB}M PFS",
+        f"mount {game['label']}",
+        "cd /",
+        f"lcd '{os.path.join(icons_dir, game['game_id'])}'",
+        "mkdir res",
+        "cd res",
+        "put info.sys",
+        "put jkt_001.png",
+    ]
+    if game["disc_type"] == "POPS":
+        commands.append(f"lcd '{os.path.join(assets_dir, 'POPStarter')}'")
+        commands += [f"put {name}" for name in POPSTARTER_FILES]
+    commands.append("umount")
+    return commands
+
+def build_commands(device, games, icons_dir, assets_dir):
+    # Partitions are created in reverse order of master.list, as the installer always has.
+    # Every command comes with the label of the game it is run for, None for the ones around them.
+    commands = [(None, f"device {device}")]
+    for game in games:
+        commands += [(game["label"], command) for command in partition_commands(game, icons_dir, assets_dir)]
+    commands.append((None, "exit"))
+    return commands
+
+def build_script(commands):
+    return "\n".join(command for _, command in commands) + "\n"
+
+def parse_output(errors, commands, created, games):
+    # PFS Shell does not echo the commands it reads. It prints a prompt on stderr before each one, followed by
+    # the errors of that command, so the text after the Nth prompt belongs to the Nth command of the script.
+    # Errors of the commands that are not run for a game are returned on their own.
+    results = {game["label"]: {"created": game["label"] in created, "errors": []} for game in games}
+    unattributed = []
+    for (label, command), output in zip(commands, PROMPT.split(errors)[1:]):
+        lines = [line for line in output.splitlines() if line.strip()]
+        if not any("(!)" in line for line in lines):
+            continue
+        (results[label]["errors"] if label else unattributed).extend(f"{command}: {line}" for line in lines)
+    return results, unattributed
+
+def report(message, log):
+    # Messages go to the terminal and, in order with the PFS Shell and HDL Dump output, to the log
+    print(message)
+    if log:
+        log.write(message + "\n")
+
+def run_pfs_shell(pfs_shell, script, log):
+    # The prompts and errors are read from stderr, stdout only has the driver messages
+    process = subprocess.run([pfs_shell], input=script, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if log:
+        log.write(script)
+        log.write(process.stderr + "\n")
+        log.write(process.stdout)
+    return process.stderr
+
+def created_partitions(device, log):
+    # HDL Dump toc does not read image files, the APA partition table is read directly instead
+    try:
+        with Drive(device) as drive:
+            return {p.id for p in drive.partitions if not p.is_sub}
+    except (OSError, ValueError, struct.error, APAError) as e:
+        report(f"Error: Cannot read the partition table of {device}: {e}", log)
+        return set()
+
+def modify_header(hdl_dump, device, label, directory, log):
+    # HDL Dump reads icon.sys, list.ico, boot.kelf and system.cnf from the working directory
+    try:
+        process = subprocess.run([hdl_dump, "modify_header", device, label], cwd=directory,
+                                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    except OSError as e:
+        if log:
+            log.write(f"{e}\n")
+        return False
+    if log:
+        log.write(process.stdout)
+    return process.returncode == 0
+
+def main(device, games_list_path, icons_dir, assets_dir, pfs_shell, hdl_dump, available=None, dry_run=False, log=None):
+    games = list(reversed(read_games(games_list_path)))
+    pfs_shell, hdl_dump = os.path.abspath(pfs_shell), os.path.abspath(hdl_dump)
+
+    if available is not None:
+        budget = available // PARTITION_SIZE_MB
+        if len(games) > budget:
+            report(f"Warning: Insufficient space for another partition. Only {max(budget, 0)} of {len(games)} games will be installed.", log)
+            games = games[:max(budget, 0)]
+
+    if not games:
+        report("No game partitions to create.", log)
+        return 0
+
+    commands = build_commands(device, games, icons_dir, assets_dir)
+    script = build_script(commands)
+    if dry_run:
+        sys.stdout.write(script)
+        return 0
+
+    errors = run_pfs_shell(pfs_shell, script, log)
+    results, unattributed = parse_output(errors, commands, created_partitions(device, log), games)
+
+    failed = 0
+    for line in unattributed:
+        failed += 1
+        report(f"Error: PFS Shell returned an error: {line}", log)
+    for game in games:
+        result = results[game["label"]]
+        if not result["created"] or result["errors"]:
+            failed += 1
+            report(f"Error: Failed to create {game['label']}", log)
+            for line in result["errors"]:
+                report(f"  {line}", log)
+            continue
+        if not modify_header(hdl_dump, device, game["label"], os.path.join(icons_dir, game["game_id"]), log):
+            failed += 1
+            report(f"Error: Failed to modify header of {game['label']}.", log)
+            continue
+        report(f"Created {game['label']}", log)
+    return failed
+
+def usage():
+    print("Usage: pfs-batch.py [options] <device|image> <master.list> <icons_dir> <assets_dir>")
+    print("  -a MB        Free space on the device, partitions that do not fit are skipped")
+    print("  -p path      PFS Shell executable")
+    print("  -d path      HDL Dump executable")
+    print("  -l file      Append PFS Shell and HDL Dump output and the messages printed to file")
+    print("  -n           Print the PFS Shell script without running it")
+
+if __name__ == "__main__":
+    helper_dir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        optlist, args = gnu_getopt(sys.argv[1:], "a:p:d:l:nh")
+    except GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(1)
+
+    options = dict(optlist)
+    if "-h" in options or len(args) != 4:
+        usage()
+        sys.exit(0 if "-h" in options else 1)
+
+    log = open(options["-l"], "a", buffering=1) if "-l" in options else None
+    failed = main(
+        *args,
+        pfs_shell=options.get("-p", os.path.join(helper_dir, "PFS Shell.elf")),
+        hdl_dump=options.get("-d", os.path.join(helper_dir, "HDL Dump.elf")),
+        available=int(options["-a"]) if "-a" in options else None,
+        dry_run="-n" in options,
+        log=log,
+    )
+    if log:
+        log.close()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,166 @@
+import sys
+import os
+from array import array
+from multiprocessing import Pool
+
+from PIL import Image
+
+# Batch version of ps2iconmaker.sh: builds HDD-OSD icons for every game in master.list in one run
+
+TEXTURE_SIZE = 128
+
+# Icon types, as numbered by ps2iconmaker.sh: mesh, template and the (image, size, exact, rotate, position) layers
+ICON_TYPES = {
+    1: ("ps2dvdicon.icn", "PS2-NTSC.bmp", [
+        ("COV", (63, 90), True, False, (0, 2)),
+        ("COV2", (63, 90), True, False, (65, 2)),
+        ("LAB", (7, 90), False, True, (20, 98)),
+    ]),
+    2: ("ps2dvdicon.icn", "PS2-PAL.bmp", [
+        ("COV", (63, 90), True, False, (0, 2)),
+        ("COV2", (63, 90), True, False, (65, 2)),
+        ("LAB", (7, 90), False, True, (20, 98)),
+    ]),
+    3: ("ps1cdusicon.icn", "PS1-USA.bmp", [
+        ("COV", (62, 62), True, False, (8, 1)),
+        ("COV2", (69, 63), True, False, (1, 64)),
+        ("LAB", (4, 63), True, False, (93, 58)),
+    ]),
+    4: ("ps1cdusicon.icn", "PS1-USA-GH.bmp", [
+        ("COV", (62, 62), True, False, (8, 1)),
+        ("COV2", (69, 63), True, False, (1, 64)),
+        ("LAB", (4, 63), True, False, (93, 58)),
+    ]),
+    5: ("ps1cdpaljpicon.icn", "PS1-JPN.bmp", [
+        ("COV", (62, 62), True, False, (8, 1)),
+        ("COV2", (69, 63), True, False, (1, 64)),
+        ("LAB", (6, 63), True, False, (93, 58)),
+    ]),
+    6: ("ps1cdpaljpicon.icn", "PS1-PAL.bmp", [
+        ("COV", (62, 62), True, False, (8, 1)),
+        ("COV2", (69, 63), True, False, (1, 64)),
+        ("LAB", (6, 63), True, False, (93, 58)),
+    ]),
+    7: ("ps1multidiscicon.icn", "PS1-MULTI.bmp", [
+        ("COV", (69, 62), True, False, (1, 1)),
+        ("COV2", (69, 62), True, False, (1, 64)),
+        ("LAB", (4, 62), True, False, (71, 1)),
+        ("LAB", (4, 62), True, False, (78, 1)),
+        ("LAB", (4, 62), True, False, (71, 64)),
+        ("LAB", (4, 62), True, False, (79, 64)),
+    ]),
+}
+
+# Templates are loaded once per worker process
+templates = {}
+
+def icon_type(game_id, disc_type):
+    # Same selection as the "Creating HDD-OSD icon" step in 03-Game-Installer.sh
+    if disc_type != "POPS":
+        return 2 if game_id[2:3] == "E" else 1
+    if game_id[2:3] == "U" or game_id[0:1] == "L":
+        return 3
+    if game_id[2:3] == "E":
+        return 6
+    return 5
+
+def load_templates(template_path):
+    for number, (mesh, template, layers) in ICON_TYPES.items():
+        with open(os.path.join(template_path, mesh), "rb") as f:
+            mesh_data = f.read()
+        with Image.open(os.path.join(template_path, template)) as img:
+            templates[number] = (mesh_data, img.convert("RGB"))
+
+def resize_layer(img, size, exact, rotate):
+    if exact:
+        img = img.resize(size, Image.LANCZOS)
+    else:
+        # Fit inside the box keeping the aspect ratio, like "-resize WxH" without "!"
+        scale = min(size[0] / img.width, size[1] / img.height)
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+    if rotate:
+        img = img.transpose(Image.ROTATE_270)  # 90 degrees clockwise
+    return img
+
+def texture_data(img):
+    # 128x128 RGB555 with red in the low bits, rows top to bottom, as cut out of the flipped BGR BMP
+    texture = array('H', (
+        ((b >> 3) << 10) | ((g >> 3) << 5) | (r >> 3)
+        for r, g, b in zip(*(iter(img.tobytes()),) * 3)
+    ))
+    if sys.byteorder != "little":
+        texture.byteswap()
+    return texture.tobytes()
+
+def make_icon(game_id, number, image_path):
+    mesh_data, template = templates[number]
+    canvas = template.copy()
+    sources = {}
+
+    for name, size, exact, rotate, position in ICON_TYPES[number][2]:
+        if name not in sources:
+            with Image.open(os.path.join(image_path, f"{game_id}_{name}.png")) as img:
+                sources[name] = img.convert("RGBA")
+        layer = resize_layer(sources[name], size, exact, rotate)
+        canvas.paste(layer, position, layer)
+
+    output = os.path.join(image_path, f"{game_id}.ico")
+    with open(output + ".tmp", "wb") as f:
+        f.write(mesh_data)
+        f.write(texture_data(canvas))
+    os.replace(output + ".tmp", output)
+
+def process_game(args):
+    game_id, number, image_path = args
+    try:
+        make_icon(game_id, number, image_path)
+        return game_id, None
+    except Exception as e:
+        return game_id, e
+
+def has_assets(image_path, game_id):
+    for name in ("COV", "COV2", "LAB"):
+        path = os.path.join(image_path, f"{game_id}_{name}.png")
+        if not os.path.isfile(path) or os.path.getsize(path) == 0:
+            return False
+    return True
+
+def read_games(games_list_path, image_path):
+    games = []
+    seen = set()
+    with open(games_list_path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("|")
+            if len(fields) < 4 or fields[1] in seen:
+                continue
+            # One icon per game ID, two workers must not write the same .ico
+            game_id, disc_type = fields[1], fields[3]
+            seen.add(game_id)
+            # Only games whose icon was not found in the database have assets waiting in image_path
+            if os.path.isfile(os.path.join(image_path, f"{game_id}.ico")) or not has_assets(image_path, game_id):
+                continue
+            games.append((game_id, icon_type(game_id, disc_type), image_path))
+    return games
+
+def main(games_list_path, template_path, image_path):
+    games = read_games(games_list_path, image_path)
+    if not games:
+        print("No HDD-OSD icons to create.")
+        return 0
+
+    print(f"Creating {len(games)} HDD-OSD icons...")
+    failed = 0
+    with Pool(initializer=load_templates, initargs=(template_path,)) as pool:
+        for game_id, error in pool.imap_unordered(process_game, games, chunksize=8):
+            if error is None:
+                print(f"Created HDD-OSD icon for {game_id}")
+            else:
+                failed += 1
+                print(f"Error: failed to create icon for {game_id}: {error}")
+    return failed
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage: ps2iconmaker.py <master.list> <template_path> <image_path>")
+        sys.exit(1)
+    sys.exit(1 if main(sys.argv[1], sys.argv[2], sys.argv[3]) else 0)
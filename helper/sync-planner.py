@@ -0,0 +1,274 @@
+import sys
+import os
+import json
+import errno
+import ctypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from getopt import gnu_getopt, GetoptError
+
+# Plans and runs the copy of the CD/DVD game folders to the OPL partition with one walk of each side.
+# Same rules as rsync -rL --ignore-existing [--delete] --exclude='.*', plus a manifest of what was copied
+# so replaced source files are copied again and later runs trust the manifest instead of the slow drive.
+
+MANIFEST_NAME = ".sync-manifest.json"
+PARTIAL_PREFIX = ".sync-partial-"
+DEFAULT_STREAMS = 1
+BUFFER_SIZE = 8 * 1024 * 1024
+MB = 1024 * 1024
+
+def load_manifest(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(path, manifest):
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def walk_source(root, subdirs):
+    # Symlinks are followed like rsync -L, hidden files and folders are left out
+    files = {}
+    for subdir in subdirs:
+        top = os.path.join(root, subdir)
+        for dirpath, dirnames, filenames in os.walk(top, followlinks=True):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for name in sorted(filenames):
+                if name.startswith("."):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files[os.path.relpath(path, root)] = (st.st_size, st.st_mtime_ns)
+    return files
+
+def walk_destination(root, subdirs):
+    # Names only, the drive is only stat'ed for files the manifest does not know about
+    files, dirs = set(), set()
+    for subdir in subdirs:
+        top = os.path.join(root, subdir)
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in dirnames:
+                dirs.add(os.path.relpath(os.path.join(dirpath, name), root))
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.startswith(PARTIAL_PREFIX):
+                    # Left behind by an interrupted copy
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                elif not name.startswith("."):
+                    files.add(os.path.relpath(path, root))
+    return files, dirs
+
+def make_plan(source_root, destination_root, subdirs, delete=False, manifest_path=None):
+    manifest_path = manifest_path or os.path.join(destination_root, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    source = walk_source(source_root, subdirs)
+    dest_files, dest_dirs = walk_destination(destination_root, subdirs)
+
+    copy = []
+    for rel, (size, mtime) in source.items():
+        if rel not in dest_files:
+            copy.append((rel, size, mtime))
+            continue
+        known = manifest.get(rel)
+        if known is None:
+            # Not copied by this script, left alone like rsync --ignore-existing. Adopted when the
+            # size matches, so a later change of the source file is copied again
+            try:
+                if os.path.getsize(os.path.join(destination_root, rel)) == size:
+                    manifest[rel] = [size, mtime]
+            except OSError:
+                pass
+        elif known != [size, mtime]:
+            copy.append((rel, size, mtime))
+
+    remove, remove_dirs = [], []
+    if delete:
+        source_dirs = {os.path.dirname(rel) for rel in source}
+        for rel in list(source_dirs):
+            while rel:
+                rel = os.path.dirname(rel)
+                source_dirs.add(rel)
+        remove = sorted(rel for rel in dest_files if rel not in source)
+        remove_dirs = sorted((rel for rel in dest_dirs if rel not in source_dirs), reverse=True)
+
+    # Forget files that are no longer on the drive
+    for rel in list(manifest):
+        if rel not in dest_files:
+            del manifest[rel]
+    save_manifest(manifest_path, manifest)
+
+    delete_bytes = 0
+    for rel in remove:
+        try:
+            delete_bytes += os.path.getsize(os.path.join(destination_root, rel))
+        except OSError:
+            pass
+
+    return {
+        "source": os.path.abspath(source_root),
+        "destination": os.path.abspath(destination_root),
+        "manifest": os.path.abspath(manifest_path),
+        "copy": copy,
+        "delete": remove,
+        "delete_dirs": remove_dirs,
+        "source_bytes": sum(size for size, _ in source.values()),
+        "copy_bytes": sum(size for _, size, _ in copy),
+        "delete_bytes": delete_bytes,
+    }
+
+def libc_fallocate():
+    # fallocate() of the C library is the bare syscall, unlike posix_fallocate() which falls back to writing
+    # every block of the file where the filesystem cannot reserve space, exfat-fuse for one
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        function = getattr(libc, "fallocate64", None) or libc.fallocate
+    except (OSError, AttributeError):
+        return None
+    function.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+    function.restype = ctypes.c_int
+    return function
+
+LIBC_FALLOCATE = None if hasattr(os, "fallocate") else libc_fallocate()
+
+def fallocate(fd, size):
+    if hasattr(os, "fallocate"):
+        os.fallocate(fd, 0, 0, size)
+    elif LIBC_FALLOCATE is None:
+        raise OSError(errno.ENOSYS, os.strerror(errno.ENOSYS))
+    elif LIBC_FALLOCATE(fd, 0, 0, size) != 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+
+def preallocate(fd, size):
+    # Reserve the whole file up front, so images copied side by side do not interleave their clusters.
+    # PS2 loaders read the images straight from the exFAT partition, where fragmentation costs.
+    # Where the filesystem cannot reserve space (EOPNOTSUPP) the file is copied without it.
+    if size:
+        try:
+            fallocate(fd, size)
+        except OSError:
+            pass
+
+def copy_file(source, destination):
+    # copy_file_range keeps the data in the kernel, large buffers are used where it is not supported
+    with open(source, "rb") as fin, open(destination, "wb") as fout:
+        preallocate(fout.fileno(), os.fstat(fin.fileno()).st_size)
+        try:
+            while os.copy_file_range(fin.fileno(), fout.fileno(), BUFFER_SIZE):
+                pass
+            return
+        except (AttributeError, OSError):
+            fin.seek(0)
+            fout.seek(0)
+        buffer = bytearray(BUFFER_SIZE)
+        view = memoryview(buffer)
+        while True:
+            n = fin.readinto(buffer)
+            if not n:
+                break
+            fout.write(view[:n])
+        fout.truncate()
+
+def run_plan(plan, streams=DEFAULT_STREAMS):
+    source_root, destination_root = plan["source"], plan["destination"]
+    manifest = load_manifest(plan["manifest"])
+    lock = threading.Lock()
+    failed = 0
+
+    for rel in plan["delete"]:
+        try:
+            os.remove(os.path.join(destination_root, rel))
+            manifest.pop(rel, None)
+            print(f"Deleted {rel}")
+        except OSError as e:
+            failed += 1
+            print(f"Error: failed to delete {rel}: {e}")
+    for rel in plan["delete_dirs"]:
+        try:
+            os.rmdir(os.path.join(destination_root, rel))
+        except OSError:
+            pass
+
+    def copy_one(item):
+        rel, size, mtime = item
+        destination = os.path.join(destination_root, rel)
+        partial = os.path.join(os.path.dirname(destination), PARTIAL_PREFIX + os.path.basename(destination))
+        try:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            copy_file(os.path.join(source_root, rel), partial)
+            os.replace(partial, destination)
+        except OSError as e:
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+            return rel, size, e
+        with lock:
+            manifest[rel] = [size, mtime]
+        return rel, size, None
+
+    try:
+        with ThreadPoolExecutor(max_workers=streams) as executor:
+            for rel, size, error in executor.map(copy_one, plan["copy"]):
+                if error is None:
+                    print(f"Copied {rel} ({(size + MB - 1) // MB} MB)")
+                else:
+                    failed += 1
+                    print(f"Error: failed to copy {rel}: {error}")
+    finally:
+        save_manifest(plan["manifest"], manifest)
+    return failed
+
+def usage():
+    print("Usage: sync-planner.py [options] <source_root> <destination_root> <subdir>...")
+    print("       sync-planner.py -r plan.json [-j streams]")
+    print("  -d           Delete files from the destination that are not in the source")
+    print("  -o file      Write the plan to file, and print the totals as shell variables")
+    print("  -m file      Manifest of copied files (default <destination_root>/%s)" % MANIFEST_NAME)
+    print("  -r file      Run a plan written with -o")
+    print("  -j streams   Number of files copied at the same time (default %d)" % DEFAULT_STREAMS)
+
+if __name__ == "__main__":
+    try:
+        optlist, args = gnu_getopt(sys.argv[1:], "do:m:r:j:h")
+    except GetoptError as err:
+        print(str(err))
+        usage()
+        sys.exit(1)
+
+    options = dict(optlist)
+    if "-h" in options:
+        usage()
+        sys.exit(0)
+
+    streams = int(options.get("-j", DEFAULT_STREAMS))
+    if "-r" in options:
+        with open(options["-r"], "r") as f:
+            plan = json.load(f)
+        sys.exit(1 if run_plan(plan, streams) else 0)
+
+    if len(args) < 3:
+        usage()
+        sys.exit(1)
+
+    plan = make_plan(args[0], args[1], args[2:], delete="-d" in options, manifest_path=options.get("-m"))
+    if "-o" in options:
+        with open(options["-o"], "w") as f:
+            json.dump(plan, f)
+        print(f"copy_files={len(plan['copy'])}")
+        print(f"copy_mb={(plan['copy_bytes'] + MB - 1) // MB}")
+        print(f"delete_files={len(plan['delete'])}")
+        print(f"delete_mb={plan['delete_bytes'] // MB}")
+        print(f"source_mb={(plan['source_bytes'] + MB - 1) // MB}")
+    else:
+        sys.exit(1 if run_plan(plan, streams) else 0)
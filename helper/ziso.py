@@ -25,12 +25,16 @@ __version__ = "2.0"
 
 import sys
 import os
+import json
+import time
 
 import lz4.block
 from struct import pack, unpack
 from multiprocessing import Pool
 from getopt import gnu_getopt, GetoptError
 
+import instrument
+
 ZISO_MAGIC = 0x4F53495A
 DEFAULT_ALIGN = 0
 DEFAULT_BLOCK_SIZE = 0x800
@@ -39,6 +43,9 @@ DEFAULT_PADDING = br'X'
 
 MP = False
 MP_NR = 1024 * 16
+SPARSE = True
+RESUME = False
+CHECKPOINT_INTERVAL = 5
 
 
 def hexdump(data):
@@ -80,23 +87,29 @@ def usage():
     print("  -t percent Compression Threshold (1-100)")
     print("  -a align Padding alignment 0=small/slow 6=fast/large")
     print("  -p pad Padding byte")
+    print("  -d Write zero blocks when decompressing instead of leaving holes (exFAT)")
+    print("  --resume Continue an interrupted compression from its last checkpoint")
     print("  -h this help")
 
 
-def open_input_output(fname_in, fname_out):
+def open_input(fname_in):
     try:
-        fin = open(fname_in, "rb")
+        return open(fname_in, "rb")
     except IOError:
         print("Can't open %s" % (fname_in))
         sys.exit(-1)
 
+
+def open_output(fname_out, mode="wb"):
     try:
-        fout = open(fname_out, "wb")
+        return open(fname_out, mode)
     except IOError:
         print("Can't create %s" % (fname_out))
         sys.exit(-1)
 
-    return fin, fout
+
+def open_input_output(fname_in, fname_out):
+    return open_input(fname_in), open_output(fname_out)
 
 
 def seek_and_read(fin, offset, size):
@@ -127,7 +140,7 @@ def show_zso_info(fname_in, fname_out, total_bytes, block_size, total_block, ver
     print("version         %d" % (ver))
 
 
-def decompress_zso(fname_in, fname_out):
+def decompress_zso(fname_in, fname_out, sparse=True):
     fin, fout = open_input_output(fname_in, fname_out)
     magic, header_size, total_bytes, block_size, ver, align = read_zso_header(
         fin)
@@ -145,6 +158,9 @@ def decompress_zso(fname_in, fname_out):
     show_zso_info(fname_in, fname_out, total_bytes,
                   block_size, total_block, ver, align)
 
+    # Zero blocks are skipped with a seek, leaving holes where the filesystem supports them
+    zero_block = bytes(block_size)
+
     block = 0
     percent_period = total_block/100
     percent_cnt = 0
@@ -188,9 +204,15 @@ def decompress_zso(fname_in, fname_out):
                   (block, read_pos, read_size))
             sys.exit(-1)
 
-        fout.write(dec_data)
+        if sparse and not plain and dec_data == zero_block:
+            fout.seek(block_size, os.SEEK_CUR)
+        else:
+            fout.write(dec_data)
         block += 1
 
+    if sparse:
+        fout.truncate(total_block * block_size)
+
     fin.close()
     fout.close()
     print("ziso decompress completed")
@@ -216,8 +238,46 @@ def set_align(fout, write_pos, align):
     return write_pos
 
 
-def compress_zso(fname_in, fname_out, level, bsize):
-    fin, fout = open_input_output(fname_in, fname_out)
+def checkpoint_state(fname_in, total_bytes, block_size, ver, align, level):
+    st = os.stat(fname_in)
+    return {"input": os.path.abspath(fname_in), "mtime": st.st_mtime_ns, "total_bytes": total_bytes,
+            "block_size": block_size, "ver": ver, "align": align, "level": level,
+            "threshold": COMPRESS_THREHOLD, "padding": DEFAULT_PADDING.decode('latin-1')}
+
+
+def load_checkpoint(fname_ckpt, state):
+    # Returns the block to continue from and its write position, if the checkpoint matches this job
+    try:
+        with open(fname_ckpt) as f:
+            saved = json.load(f)
+    except (IOError, ValueError):
+        return None
+    if any(saved.get(key) != value for key, value in state.items()):
+        return None
+    return saved["block"], saved["write_pos"]
+
+
+def save_checkpoint(fout, fname_ckpt, state, index_buf, saved_block, block, write_pos, header_size):
+    # The index entries and data up to write_pos reach the disk before the sidecar says so
+    fout.flush()
+    if block > saved_block:
+        os.pwrite(fout.fileno(), pack('%dI' % (block - saved_block), *index_buf[saved_block:block]),
+                  header_size + saved_block * 4)
+    os.fsync(fout.fileno())
+
+    with open(fname_ckpt + ".tmp", "w") as f:
+        json.dump(dict(state, block=block, write_pos=write_pos), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(fname_ckpt + ".tmp", fname_ckpt)
+    return block
+
+
+def compress_zso(fname_in, fname_out, level, bsize, resume=False):
+    # Work goes to a .part file with a .ckpt sidecar, renamed into place once complete
+    fname_part = fname_out + ".part"
+    fname_ckpt = fname_out + ".ckpt"
+    fin = open_input(fname_in)
     fin.seek(0, os.SEEK_END)
     total_bytes = fin.tell()
     fin.seek(0)
@@ -230,23 +290,46 @@ def compress_zso(fname_in, fname_out, level, bsize):
 
     header = generate_zso_header(
         magic, header_size, total_bytes, block_size, ver, align)
-    fout.write(header)
 
     total_block = total_bytes // block_size
     index_buf = [0 for i in range(total_block + 1)]
 
-    fout.write(b"\x00\x00\x00\x00" * len(index_buf))
+    state = checkpoint_state(fname_in, total_bytes, block_size, ver, align, level)
+    checkpoint = load_checkpoint(fname_ckpt, state) if resume and os.path.exists(fname_part) else None
+
+    if checkpoint:
+        block, write_pos = checkpoint
+        fout = open_output(fname_part, "r+b")
+        fout.seek(len(header))
+        index_buf[:block] = unpack('%dI' % block, fout.read(4 * block))
+        fout.truncate(write_pos)
+        fout.seek(write_pos)
+        fin.seek(block * block_size)
+        print("Resuming at block %d of %d" % (block, total_block))
+    else:
+        if resume:
+            print("No usable checkpoint for '%s', starting from the beginning" % (fname_out))
+        fout = open_output(fname_part)
+        fout.write(header)
+        fout.write(b"\x00\x00\x00\x00" * len(index_buf))
+        block = 0
+        write_pos = fout.tell()
+
     show_comp_info(fname_in, fname_out, total_bytes, block_size, ver, align, level)
 
-    write_pos = fout.tell()
     percent_period = total_block/100
     percent_cnt = 0
 
     if MP:
         pool = Pool()
 
-    block = 0
+    saved_block = block
+    saved_time = time.monotonic()
     while block < total_block:
+        if time.monotonic() - saved_time >= CHECKPOINT_INTERVAL:
+            saved_block = save_checkpoint(fout, fname_ckpt, state, index_buf, saved_block, block, write_pos, len(header))
+            saved_time = time.monotonic()
+
         if MP:
             percent_cnt += min(total_block - block, MP_NR)
         else:
@@ -316,22 +399,28 @@ def compress_zso(fname_in, fname_out, level, bsize):
         idx = pack('I', i)
         fout.write(idx)
 
-    print("ziso compress completed , total size = %8d bytes , rate %d%%" %
-          (write_pos, (write_pos*100/total_bytes)))
-
+    fout.flush()
+    os.fsync(fout.fileno())
     fin.close()
     fout.close()
 
+    os.replace(fname_part, fname_out)
+    if os.path.exists(fname_ckpt):
+        os.remove(fname_ckpt)
+
+    print("ziso compress completed , total size = %8d bytes , rate %d%%" %
+          (write_pos, (write_pos*100/total_bytes)))
+
 
 def parse_args():
-    global MP, COMPRESS_THREHOLD, DEFAULT_PADDING, DEFAULT_ALIGN
+    global MP, COMPRESS_THREHOLD, DEFAULT_PADDING, DEFAULT_ALIGN, SPARSE, RESUME
 
     if len(sys.argv) < 2:
         usage()
         sys.exit(-1)
 
     try:
-        optlist, args = gnu_getopt(sys.argv, "c:b:mt:a:p:h")
+        optlist, args = gnu_getopt(sys.argv, "c:b:mt:a:p:dh", ["resume"])
     except GetoptError as err:
         print(str(err))
         usage()
@@ -353,6 +442,10 @@ def parse_args():
             DEFAULT_ALIGN = int(a)
         elif o == '-p':
             DEFAULT_PADDING = bytes(a[0], encoding='utf8')
+        elif o == '-d':
+            SPARSE = False
+        elif o == '--resume':
+            RESUME = True
         elif o == '-h':
             usage()
             sys.exit(0)
@@ -409,16 +502,13 @@ def main():
     level, bsize, fname_in, fname_out = parse_args()
 
     if level == 0:
-        decompress_zso(fname_in, fname_out)
+        with instrument.stage("decompress"):
+            decompress_zso(fname_in, fname_out, SPARSE)
     else:
-        compress_zso(fname_in, fname_out, level, bsize)
-
+        with instrument.stage("compress"):
+            compress_zso(fname_in, fname_out, level, bsize, RESUME)
 
-PROFILE = False
 
 if __name__ == "__main__":
-    if PROFILE:
-        import cProfile
-        cProfile.run("main()")
-    else:
-        main()
+    # Set PSBBN_PROFILE to profile a run, see instrument.py
+    instrument.run(main)
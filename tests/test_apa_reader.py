@@ -0,0 +1,78 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+HELPER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helper")
+sys.path.insert(0, HELPER_DIR)
+
+import apa_reader
+
+# Reads an image formatted by the PFS Shell shipped in helper/, the same tool the installer writes the drive with
+
+PFS_SHELL = os.path.join(HELPER_DIR, "PFS Shell.elf")
+IMAGE_SIZE = 8 * 1024 ** 3  # sparse, PFS Shell cannot initialize much smaller drives
+VCD_SIZE = 3 * 1024 * 1024 + 17  # spans several zones
+
+@pytest.fixture(scope="module")
+def image(tmp_path_factory):
+    if not os.access(PFS_SHELL, os.X_OK):
+        pytest.skip("PFS Shell is not available")
+    path = tmp_path_factory.mktemp("apa")
+    with open(path / "hdd.img", "wb") as f:
+        f.truncate(IMAGE_SIZE)
+    with open(path / "GAME.VCD", "wb") as f:
+        f.write(os.urandom(VCD_SIZE))
+    (path / "readme.txt").write_text("not a VCD\n")
+    script = "\n".join([
+        "device hdd.img",
+        "initialize yes",
+        "mkpart __.POPS 128M PFS",
+        "mount __.POPS",
+        "put GAME.VCD",
+        "put readme.txt",
+        "mkdir saves",
+        "umount",
+        "mkpart PP.SLUS-20002.ICO 128M PFS",
+        "mount PP.SLUS-20002.ICO",
+        "mkdir res",
+        "umount",
+        "exit",
+    ]) + "\n"
+    try:
+        subprocess.run([PFS_SHELL], input=script, cwd=path, capture_output=True, text=True, timeout=120, check=True)
+    except (OSError, subprocess.SubprocessError) as e:
+        pytest.skip(f"PFS Shell cannot run here: {e}")
+    return str(path / "hdd.img")
+
+def test_partitions(image):
+    with apa_reader.Drive(image) as drive:
+        ids = [p.id for p in drive.partitions if not p.is_sub]
+        assert ids[0] == "__mbr"
+        assert "__.POPS" in ids and "PP.SLUS-20002.ICO" in ids
+        assert drive.total_mb() == IMAGE_SIZE // (1024 * 1024)
+        assert drive.find("PP.SLUS-20002.ICO").size_mb == 128
+
+def test_listdir(image):
+    with apa_reader.Drive(image) as drive:
+        entries = {e["name"]: e for e in drive.pfs("__.POPS").listdir("/")}
+        assert sorted(entries) == ["GAME.VCD", "readme.txt", "saves"]
+        assert entries["GAME.VCD"]["size"] == VCD_SIZE and not entries["GAME.VCD"]["dir"]
+        assert entries["saves"]["dir"]
+        assert [e["name"] for e in drive.pfs("PP.SLUS-20002.ICO").listdir("/")] == ["res"]
+        assert drive.pfs("PP.SLUS-20002.ICO").listdir("/res") == []
+
+def test_installed(image):
+    with apa_reader.Drive(image) as drive:
+        assert apa_reader.installed(drive) == {
+            "pp": ["PP.SLUS-20002.ICO"],
+            "vcd": [{"name": "GAME.VCD", "size": VCD_SIZE}],
+        }
+
+def test_not_pfs(image):
+    with apa_reader.Drive(image) as drive:
+        with pytest.raises(apa_reader.APAError):
+            drive.pfs("__mbr")
+        with pytest.raises(apa_reader.APAError):
+            drive.find("PP.MISSING")
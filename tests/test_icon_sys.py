@@ -0,0 +1,123 @@
+import os
+import sys
+import random
+import struct
+import unicodedata
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helper"))
+
+import icon_sys_to_txt as icon_sys
+
+# Seeded round-trip properties of the PS2X text <-> PS2D binary icon.sys conversion
+
+SEEDS = range(200)
+ASCII = [chr(c) for c in range(0x20, 0x7F) if chr(c) not in "=\\"]
+ACCENTED = list("éèêëàâäçñöüÉÀÇÑÖÜ")
+JAPANESE = list("あいうえおカキクケコゼルダ伝説龍")
+TITLE_LENGTH = 48  # create_icon_sys and partition_metadata cut titles to 48 characters
+
+def random_title(rng, alphabet, max_length=TITLE_LENGTH):
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length))).strip()
+
+def random_parsed(rng, title0, title1):
+    return {
+        "title0": title0,
+        "title1": title1,
+        "bgcola": rng.randint(0, 127),
+        **{f"bgcol{i}": tuple(rng.randint(0, 127) for _ in range(3)) for i in range(4)},
+        **{f"lightdir{i}": tuple(round(rng.uniform(-1, 1), 4) for _ in range(3)) for i in range(3)},
+        **{key: tuple(rng.randint(0, 127) for _ in range(3)) for key in icon_sys.LIGHT_COLOUR_KEYS},
+        "uninstallmes0": "",
+        "uninstallmes1": "",
+        "uninstallmes2": "",
+    }
+
+def to_text(parsed):
+    # format_icon_txt expects float32 light colours as read from a binary, these are already 0-127
+    lines = ["PS2X"]
+    for key, value in parsed.items():
+        if isinstance(value, tuple):
+            value = ",".join(f"{v:.4f}" if key.startswith("lightdir") else str(v) for v in value)
+        lines.append(f"{key}={value}")
+    return "\n".join(lines)
+
+def decoded(parsed):
+    data = icon_sys.encode_icon_sys(icon_sys.parse_icon_txt(to_text(parsed)))
+    assert len(data) == icon_sys.ICON_SYS_SIZE
+    return data, icon_sys.parse_icon_sys_buffer(data)
+
+def transliterated(title):
+    return "".join(c for c in unicodedata.normalize("NFKD", title) if not unicodedata.combining(c))
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_ascii_titles_round_trip(seed):
+    rng = random.Random(seed)
+    parsed = random_parsed(rng, random_title(rng, ASCII), random_title(rng, ASCII, 19))
+    data, result = decoded(parsed)
+    assert result["title0"] == parsed["title0"]
+    assert result["title1"] == parsed["title1"]
+    title_bytes = struct.unpack_from("<H", data, 6)[0]
+    assert data[icon_sys.TITLE_OFFSET + icon_sys.TITLE_LENGTH - 1] == 0
+    assert title_bytes <= icon_sys.TITLE_LENGTH - 1
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_colours_and_lights_round_trip(seed):
+    rng = random.Random(seed)
+    parsed = random_parsed(rng, random_title(rng, ASCII), random_title(rng, ASCII))
+    _, result = decoded(parsed)
+    text = icon_sys.format_icon_txt(result)
+    assert icon_sys.parse_icon_txt(text)["bgcola"] == parsed["bgcola"]
+    values = dict(line.partition("=")[::2] for line in text.splitlines()[1:])
+    expected = dict(line.partition("=")[::2] for line in to_text(parsed).splitlines()[1:])
+    for key in ("bgcol0", "bgcol1", "bgcol2", "bgcol3", "lightdir0", "lightdir1", "lightdir2") + icon_sys.LIGHT_COLOUR_KEYS:
+        assert values[key] == expected[key], key
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_accented_titles_are_transliterated(seed):
+    rng = random.Random(seed)
+    title = random_title(rng, ASCII + ACCENTED, 30)
+    _, result = decoded(random_parsed(rng, title, "Publisher"))
+    assert result["title0"] == transliterated(title)
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_any_title_encodes(seed):
+    rng = random.Random(seed)
+    alphabet = ASCII + ACCENTED + JAPANESE + ["Æ", "ß", "½", "²", "™"]
+    parsed = random_parsed(rng, random_title(rng, alphabet, 64), random_title(rng, alphabet, 64))
+    data, result = decoded(parsed)
+    assert struct.unpack_from("<H", data, 6)[0] <= icon_sys.TITLE_LENGTH - 1
+    # Titles may be shortened to fit, but never changed beyond transliteration
+    for key in ("title0", "title1"):
+        assert unicodedata.normalize("NFKC", icon_sys.transliterate_text(parsed[key])).startswith(result[key]), key
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_binary_round_trip(seed):
+    rng = random.Random(seed)
+    data, _ = decoded(random_parsed(rng, random_title(rng, ASCII + JAPANESE), random_title(rng, ASCII, 10)))
+    assert icon_sys.check_round_trip(data) == []
+    assert icon_sys.encode_icon_sys(icon_sys.parse_icon_sys_buffer(data)) == data
+
+def test_long_titles_fall_back_to_half_width():
+    parsed = random_parsed(random.Random(0), "Metal Gear Solid 2: Sons of Liberty", "Konami")
+    data, result = decoded(parsed)
+    assert (result["title0"], result["title1"]) == ("Metal Gear Solid 2: Sons of Liberty", "Konami")
+    assert struct.unpack_from("<H", data, 6)[0] == len("Metal Gear Solid 2: Sons of Liberty")
+
+def test_short_titles_stay_full_width():
+    data, _ = decoded(random_parsed(random.Random(0), "ICO", "Sony"))
+    assert struct.unpack_from("<H", data, 6)[0] == 6
+
+def test_text_round_trip_reports_changes():
+    text = "PS2X\ntitle0=Pokémon\ntitle1=Nintendo\nuninstallmes0=Goodbye"
+    assert icon_sys.check_text_round_trip(text) == ["text:title0", "text:uninstallmes0"]
+    assert icon_sys.check_text_round_trip("PS2X\ntitle0=Pokemon\ntitle1=Nintendo") == []
+
+def test_psu_icon_sys_is_found():
+    data, _ = decoded(random_parsed(random.Random(0), "Save", "Data"))
+    entry = bytearray(0x200)
+    struct.pack_into("<H2xI", entry, 0, 0x8497, len(data))
+    entry[0x40:0x48] = b"icon.sys"
+    archive = bytes(entry) + data + bytes(-len(data) % 0x400)
+    assert [(offset, parsed["title0"]) for offset, parsed in icon_sys.iter_psu_icon_sys(archive)] == [(0x200, "Save")]
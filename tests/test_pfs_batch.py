@@ -0,0 +1,96 @@
+import os
+import sys
+import subprocess
+import importlib.util
+
+import pytest
+
+HELPER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helper")
+sys.path.insert(0, HELPER_DIR)
+
+spec = importlib.util.spec_from_file_location("pfs_batch", os.path.join(HELPER_DIR, "pfs-batch.py"))
+pfs_batch = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(pfs_batch)
+
+# Error attribution of pfs-batch.py against what PFS Shell really prints
+
+PFS_SHELL = os.path.join(HELPER_DIR, "PFS Shell.elf")
+
+GAMES = [
+    {"label": "PP.SLUS-20002.ICO", "game_id": "SLUS_200.02", "disc_type": "CD"},
+    {"label": "PP.SCES-50000.RIDGE", "game_id": "SCES_500.00", "disc_type": "DVD"},
+    {"label": "PP.SLES-50003.TAKEN", "game_id": "SLES_500.03", "disc_type": "DVD"},
+]
+
+# stderr of PFS Shell for the script of GAMES: the icons of SCES_500.00 have no jkt_001.png, PP.SLES-50003.TAKEN
+# already existed and its icons folder is missing
+CAPTURED = (
+    'pfsshell for POSIX systems\n'
+    'https://github.com/ps2homebrew/pfsshell\n'
+    '\n'
+    'This program uses pfs, apa, iomanX, \n'
+    'code from ps2sdk (https://github.com/ps2dev/ps2sdk)\n'
+    '\n'
+    'Type "help" for a list of commands.\n'
+    '\n'
+    '> # # PP.SLUS-20002.ICO:/# PP.SLUS-20002.ICO:/# PP.SLUS-20002.ICO:/# PP.SLUS-20002.ICO:/# '
+    'PP.SLUS-20002.ICO:/res# PP.SLUS-20002.ICO:/res# PP.SLUS-20002.ICO:/res# # # PP.SCES-50000.RIDGE:/res# '
+    'PP.SCES-50000.RIDGE:/# PP.SCES-50000.RIDGE:/# PP.SCES-50000.RIDGE:/# PP.SCES-50000.RIDGE:/res# '
+    'PP.SCES-50000.RIDGE:/res# jkt_001.png: No such file or directory\n'
+    '(!) Exit code is -1; errno 2 (Unknown error -2).\n'
+    'PP.SCES-50000.RIDGE:/res# # (!) Exit code is -1.\n'
+    '# PP.SLES-50003.TAKEN:/res# PP.SLES-50003.TAKEN:/# (!) Exit code is -1; errno 2 (Unknown error -2).\n'
+    'PP.SLES-50003.TAKEN:/# PP.SLES-50003.TAKEN:/# PP.SLES-50003.TAKEN:/res# PP.SLES-50003.TAKEN:/res# '
+    'jkt_001.png: No such file or directory\n'
+    '(!) Exit code is -1; errno 2 (Unknown error -2).\n'
+    'PP.SLES-50003.TAKEN:/res# # '
+)
+
+def test_captured_output():
+    commands = pfs_batch.build_commands("hdd.img", GAMES, "/media/icons", "/media/assets")
+    created = {"__mbr", "PP.SLUS-20002.ICO", "PP.SCES-50000.RIDGE", "PP.SLES-50003.TAKEN"}
+    results, unattributed = pfs_batch.parse_output(CAPTURED, commands, created, GAMES)
+    assert unattributed == []
+    assert results["PP.SLUS-20002.ICO"] == {"created": True, "errors": []}
+    assert results["PP.SCES-50000.RIDGE"]["errors"] == [
+        "put jkt_001.png: jkt_001.png: No such file or directory",
+        "put jkt_001.png: (!) Exit code is -1; errno 2 (Unknown error -2).",
+    ]
+    assert results["PP.SLES-50003.TAKEN"]["errors"] == [
+        "mkpart PP.SLES-50003.TAKEN 8M PFS: (!) Exit code is -1.",
+        "lcd '/media/icons/SLES_500.03': (!) Exit code is -1; errno 2 (Unknown error -2).",
+        "put jkt_001.png: jkt_001.png: No such file or directory",
+        "put jkt_001.png: (!) Exit code is -1; errno 2 (Unknown error -2).",
+    ]
+
+def test_errors_outside_games():
+    commands = pfs_batch.build_commands("missing.img", GAMES[:1], "/media/icons", "/media/assets")
+    errors = "> (!) Exit code is -2.\n" + "# " * (len(commands) - 1)
+    results, unattributed = pfs_batch.parse_output(errors, commands, set(), GAMES[:1])
+    assert unattributed == ["device missing.img: (!) Exit code is -2."]
+    assert results["PP.SLUS-20002.ICO"] == {"created": False, "errors": []}
+
+def test_pfs_shell(tmp_path):
+    if not os.access(PFS_SHELL, os.X_OK):
+        pytest.skip("PFS Shell is not available")
+    image = str(tmp_path / "hdd.img")
+    with open(image, "wb") as f:
+        f.truncate(8 * 1024 ** 3)
+    icons = tmp_path / "icons"
+    for game_id, files in (("SLUS_200.02", ["info.sys", "jkt_001.png"]), ("SCES_500.00", ["info.sys"])):
+        (icons / game_id).mkdir(parents=True)
+        for name in files:
+            (icons / game_id / name).write_bytes(b"\0" * 64)
+    try:
+        pfs_batch.run_pfs_shell(PFS_SHELL, f"device {image}\ninitialize yes\nexit\n", None)
+    except OSError as e:
+        pytest.skip(f"PFS Shell cannot run here: {e}")
+
+    games = GAMES[:2]
+    commands = pfs_batch.build_commands(image, games, str(icons), str(tmp_path))
+    errors = pfs_batch.run_pfs_shell(PFS_SHELL, pfs_batch.build_script(commands), None)
+    results, unattributed = pfs_batch.parse_output(errors, commands, pfs_batch.created_partitions(image, None), games)
+    assert unattributed == []
+    assert results["PP.SLUS-20002.ICO"] == {"created": True, "errors": []}
+    assert results["PP.SCES-50000.RIDGE"]["created"]
+    assert results["PP.SCES-50000.RIDGE"]["errors"][-1].startswith("put jkt_001.png: (!) Exit code is -1")